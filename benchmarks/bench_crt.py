@@ -0,0 +1,43 @@
+"""通常の復号 pow(c, d, n) と CRT 復号のスループット比較。
+
+    python -m benchmarks.bench_crt [--blocks 200] [--sizes 1024 2048 4096]
+"""
+import argparse
+import secrets
+import time
+
+from primeguard.keygen import KEY_SIZES, generate_keypair
+from primeguard.numtheory import crt_pow
+
+
+def bench(bits: int, blocks: int):
+    """bits ビット鍵で blocks 個の暗号文を復号し、(通常, CRT) の blocks/sec を返す。"""
+    key = generate_keypair(bits)
+    cs = [pow(secrets.randbelow(key.n), key.e, key.n) for _ in range(blocks)]
+
+    start = time.perf_counter()
+    plain = [pow(c, key.d, key.n) for c in cs]
+    t_plain = time.perf_counter() - start
+
+    crt = key.crt
+    start = time.perf_counter()
+    fast = [crt_pow(c, *crt) for c in cs]
+    t_crt = time.perf_counter() - start
+
+    assert plain == fast
+    return blocks / t_plain, blocks / t_crt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(KEY_SIZES))
+    args = parser.parse_args(argv)
+    print(f"{'bits':>6} {'plain/sec':>10} {'crt/sec':>10} {'speedup':>8}")
+    for bits in args.sizes:
+        plain, crt = bench(bits, args.blocks)
+        print(f"{bits:>6} {plain:>10.1f} {crt:>10.1f} {crt / plain:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""ブロックごとに pow(m, e, n) を呼ぶ暗号化と EncryptionContext の比較。
+
+    python -m benchmarks.bench_encrypt [--chars 100000] [--sizes 26 1024 2048]
+
+26 は教材用の鍵（5000〜6000 の素数）。まとめる方式は表を使わないので、
+速度が変わらない（遅くならない）ことの確認として測る。
+"""
+import argparse
+import base64
+import random
+import time
+
+from primeguard.codec import ALPHABET, CHAR_TO_VAL, PACK_BASE, EncryptionContext, pack_width
+from primeguard.keygen import generate_keypair, key_from_primes
+
+
+def encrypt_per_call(plaintext: str, n: int, e: int, pack: bool = False) -> str:
+    """以前の encrypt_blocks と同じく、ブロックごとに pow を呼ぶ版。"""
+    size = (n.bit_length() + 7) // 8
+    if pack:
+        k = pack_width(n)
+        values = []
+        for i in range(0, len(plaintext), k):
+            v = 0
+            for c in plaintext[i:i + k]:
+                v = v * PACK_BASE + CHAR_TO_VAL[c] + 1
+            values.append(v)
+    else:
+        values = [CHAR_TO_VAL[c] for c in plaintext]
+    return base64.b64encode(b''.join(pow(v, e, n).to_bytes(size, 'big') for v in values)).decode()
+
+
+def _time(fn):
+    start = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - start, out
+
+
+def bench(bits: int, chars: int, rng):
+    """[(ケース名, 従来の chars/sec, コンテキストの chars/sec), ...]"""
+    key = key_from_primes(5003, 5009, 5011) if bits <= 26 else generate_keypair(bits)
+    random_text = "".join(rng.choice(ALPHABET) for _ in range(chars))
+    rows = []
+    for name, text, pack in (("1char", random_text, False), ("pack", random_text, True)):
+        if pack and bits <= 26:
+            continue
+        t_old, expected = _time(lambda: encrypt_per_call(text, key.n, key.e, pack))
+        # 表の準備も含めて測るため、毎回新しいコンテキストを作る
+        t_new, got = _time(lambda: EncryptionContext(key.n, key.e).encrypt(text, pack))
+        assert got == expected
+        rows.append((name, len(text) / t_old, len(text) / t_new))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=100_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[26, 1024, 2048])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    print(f"{'bits':>6} {'case':<12} {'pow/sec':>12} {'context/sec':>12} {'speedup':>8}")
+    for bits in args.sizes:
+        for name, old, new in bench(bits, args.chars, rng):
+            print(f"{bits:>6} {name:<12} {old:>12.0f} {new:>12.0f} {new / old:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
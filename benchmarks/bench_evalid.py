@@ -0,0 +1,63 @@
+"""EValidator（e の判定表）と、毎回作り直す e_valid_mask の比較。
+
+    python -m benchmarks.bench_evalid [--ranges 6000 1000000] [--bits 26 1024]
+
+範囲 [3, hi) の e について、(p, q) を変えたときの表の作り直し（素因数を
+求め済みの 2 回目も）、1 つの e の判定、最も近い使える e の検索の時間を測る。
+「mask」は以前の rsaVer1.py のように、再実行のたびに e_valid_mask で
+範囲全体を作り直す場合。26 は教材用の鍵（5000〜6000 の素数）。
+"""
+import argparse
+import random
+import time
+
+from primeguard.evalid import EValidator, e_valid_mask
+from primeguard.keygen import generate_keypair
+from primeguard.primes import primes_in_range
+
+
+def _per_call(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ranges", type=int, nargs="+", default=[6000, 1_000_000])
+    parser.add_argument("--bits", type=int, nargs="+", default=[26, 1024])
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    print(f"{'bits':>6} {'hi':>9} {'mask ms':>9} {'update ms':>10} {'again ms':>9} "
+          f"{'query ns':>9} {'nearest ns':>11}")
+    for bits in args.bits:
+        if bits <= 26:
+            p, q = rng.sample(list(primes_in_range(5000, 6000)), 2)
+        else:
+            p, q = generate_keypair(bits).crt[:2]
+        for hi in args.ranges:
+            v = EValidator(3, hi)
+            start = time.perf_counter()
+            v.update(p, q)
+            first = time.perf_counter() - start
+            # (p, q) と (q, p) を交互に渡して毎回作り直させる（素因数は求め済み）
+            again = _per_call(lambda: (v.update(q, p), v.update(p, q)), 3) / 2
+            mask = _per_call(lambda: e_valid_mask((p - 1) * (q - 1), p, q, 3, hi), 3)
+            es = [rng.randrange(3, hi) for _ in range(args.queries)]
+            start = time.perf_counter()
+            for e in es:
+                v.is_valid(e)
+            query = (time.perf_counter() - start) / len(es)
+            start = time.perf_counter()
+            for e in es[:10_000]:
+                v.nearest(e)
+            nearest = (time.perf_counter() - start) / min(len(es), 10_000)
+            print(f"{bits:>6} {hi:>9} {mask * 1e3:>9.2f} {first * 1e3:>10.2f} {again * 1e3:>9.2f} "
+                  f"{query * 1e9:>9.0f} {nearest * 1e9:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""鍵生成のベンチマーク（鍵長ごとの keys/sec）。
+
+    python -m benchmarks.bench_keygen [--seconds 3] [--sizes 512 1024 2048] [--parallel]
+"""
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from primeguard.keygen import KEY_SIZES, generate_keypair, generate_keypair_parallel
+
+
+def bench(bits: int, seconds: float, executor: ProcessPoolExecutor = None):
+    """seconds 秒以上かけて bits ビット鍵を生成し、(生成数, 経過秒) を返す。"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        if executor is None:
+            generate_keypair(bits)
+        else:
+            generate_keypair_parallel(bits, executor=executor)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(KEY_SIZES))
+    parser.add_argument("--parallel", action="store_true",
+                        help="プロセスプールで並列に素数を探す")
+    args = parser.parse_args(argv)
+    executor = ProcessPoolExecutor() if args.parallel else None
+    print(f"{'bits':>6} {'keys':>6} {'keys/sec':>10} {'sec/key':>10}")
+    try:
+        for bits in args.sizes:
+            count, elapsed = bench(bits, args.seconds, executor)
+            print(f"{bits:>6} {count:>6} {count / elapsed:>10.2f} {elapsed / count:>10.3f}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Montgomery ladder（ladder_pow）の pow に対するオーバーヘッド。
+
+    python -m benchmarks.bench_ladder [--sizes 512 1024 2048] [--repeat 5]
+
+秘密鍵 d での 1 回の復号（n で直接・CRT）と、decrypt_blocks（まとめる方式、
+100 文字）の時間を pow と ladder_pow で測り、比を表示する。
+"""
+import argparse
+import random
+
+from benchmarks.run import measure
+from primeguard.codec import ALPHABET, decrypt_blocks, encrypt_blocks
+from primeguard.keygen import generate_keypair
+from primeguard.numtheory import crt_pow, ladder_pow
+
+
+def cases(bits: int, rng):
+    """(ケース名, pow の関数, ladder の関数) を返す。"""
+    key = generate_keypair(bits)
+    c = rng.randrange(key.n)
+    text = "".join(rng.choice(ALPHABET) for _ in range(100))
+    b64 = encrypt_blocks(text, key.n, key.e, pack=True)
+    return [
+        ("decrypt", lambda: pow(c, key.d, key.n), lambda: ladder_pow(c, key.d, key.n)),
+        ("decrypt-crt", lambda: crt_pow(c, *key.crt), lambda: crt_pow(c, *key.crt, modpow=ladder_pow)),
+        ("blocks-100", lambda: decrypt_blocks(b64, key.n, key.d, key.crt, pack=True),
+         lambda: decrypt_blocks(b64, key.n, key.d, key.crt, pack=True, constant_time=True)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    print(f"{'bits':>6} {'case':<12} {'pow ms':>10} {'ladder ms':>10} {'overhead':>9}")
+    for bits in args.sizes:
+        for name, plain, ladder in cases(bits, rng):
+            assert plain() == ladder()
+            t_pow = measure(plain, args.repeat)[0]
+            t_ladder = measure(ladder, args.repeat)[0]
+            print(f"{bits:>6} {name:<12} {t_pow * 1e3:>10.3f} {t_ladder * 1e3:>10.3f} {t_ladder / t_pow:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""暗号化・復号のメモリ使用量（tracemalloc のピーク）と時間。
+
+    python -m benchmarks.bench_memory [--chars 1000000] [--sizes 26 1024]
+
+ピークは呼び出し中に確保されたメモリの最大値（入力の文字列は含まない）。
+暗号文 1 バイトあたりのピークが小さいほど、大きな入力でも RSS が増えにくい。
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from primeguard.codec import ALPHABET, decrypt_blocks, encrypt_blocks
+from primeguard.keygen import generate_keypair, key_from_primes
+
+
+def peak(fn):
+    """fn() の (結果, 秒数, ピークのバイト数)。時間は tracemalloc なしで測る。"""
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        fn()
+        return out, elapsed, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=1_000_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[26, 1024])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    text = "".join(rng.choice(ALPHABET) for _ in range(args.chars))
+    print(f"{'bits':>6} {'mode':<6} {'op':<8} {'sec':>8} {'peak MB':>9} {'peak/ct':>8}")
+    for bits in args.sizes:
+        key = key_from_primes(5003, 5009, 5011) if bits <= 26 else generate_keypair(bits)
+        for pack in (False, True):
+            if pack and bits <= 26:
+                continue
+            mode = "pack" if pack else "1char"
+            ct, t_enc, p_enc = peak(lambda: encrypt_blocks(text, key.n, key.e, pack=pack))
+            pt, t_dec, p_dec = peak(lambda: decrypt_blocks(ct, key.n, key.d, key.crt, pack=pack))
+            assert pt == text
+            for op, t, p in (("encrypt", t_enc, p_enc), ("decrypt", t_dec, p_dec)):
+                print(f"{bits:>6} {mode:<6} {op:<8} {t:>8.3f} {p / 1e6:>9.1f} {p / len(ct):>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
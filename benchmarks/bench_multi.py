@@ -0,0 +1,70 @@
+"""同じ平文を多数の公開鍵で暗号化するときのスループット（受信者/秒）。
+
+    python -m benchmarks.bench_multi [--recipients 2000] [--bits 26 1024] [--chars 100]
+
+鍵ごとに encrypt_blocks を呼ぶ場合と、encrypt_for_recipients（1 プロセス /
+プロセスプール）を比べる。26 は教材用の鍵（5000〜6000 の素数）。
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from primeguard.codec import ALPHABET, encrypt_blocks, encryption_context
+from primeguard.evalid import e_candidates
+from primeguard.keygen import generate_keypair
+from primeguard.multi import encrypt_for_recipients, key_fingerprint
+from primeguard.primes import primes_in_range
+
+
+def _keys(bits: int, count: int, rng):
+    if bits <= 26:
+        primes = list(primes_in_range(5000, 6000))
+        keys = []
+        while len(keys) < count:
+            p, q = rng.sample(primes, 2)
+            es = e_candidates((p - 1) * (q - 1), p, q)
+            if es:
+                keys.append((p * q, rng.choice(es)))
+        return keys
+    # 大きな鍵は生成に時間がかかるので、何組かを作って e を変えて増やす
+    base = [generate_keypair(bits).n for _ in range(8)]
+    return [(base[i % len(base)], 65537 + 2 * (i // len(base))) for i in range(count)]
+
+
+def _rate(fn, count: int):
+    start = time.perf_counter()
+    out = fn()
+    return count / (time.perf_counter() - start), out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipients", type=int, default=2000)
+    parser.add_argument("--bits", type=int, nargs="+", default=[26, 1024])
+    parser.add_argument("--chars", type=int, default=100)
+    parser.add_argument("--pack", action="store_true")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    text = "".join(rng.choice(ALPHABET) for _ in range(args.chars))
+    print(f"{'bits':>6} {'per-key/sec':>12} {'batch/sec':>12} {'pool/sec':>12}  (workers={args.workers})")
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pool.submit(int).result()  # ワーカーの起動を計測に含めない
+        for bits in args.bits:
+            keys = _keys(bits, args.recipients, rng)
+            encryption_context.cache_clear()
+            per_key, expected = _rate(
+                lambda: {key_fingerprint(n, e): encrypt_blocks(text, n, e, args.pack) for n, e in keys},
+                len(keys))
+            batch, got = _rate(lambda: encrypt_for_recipients(text, keys, args.pack, workers=1), len(keys))
+            assert got == expected
+            pooled, got = _rate(lambda: encrypt_for_recipients(text, keys, args.pack, pool), len(keys))
+            assert got == expected
+            print(f"{bits:>6} {per_key:>12.0f} {batch:>12.0f} {pooled:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
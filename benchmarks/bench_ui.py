@@ -0,0 +1,122 @@
+"""rsa.py の操作 1 回あたりのサーバー CPU 時間（教室で多数のセッションが操作する想定）。
+
+    python -m benchmarks.bench_ui [--sessions 30]
+    git show <変更前>:rsa.py > /tmp/rsa_old.py
+    python -m benchmarks.bench_ui --app /tmp/rsa_old.py --full-reruns
+
+Streamlit の AppTest でセッションを --sessions 個作り、受信者・送信者の
+一連の操作を順番に行って、各操作の再実行にかかった CPU 時間を測る。
+操作したウィジェットが st.fragment の中にあれば、ブラウザと同じく
+そのフラグメントだけを再実行する（--full-reruns ならページ全体）。
+"""
+import argparse
+import logging
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import streamlit.testing.v1.local_script_runner as local_script_runner
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rsa.py")
+
+# (操作名, 役割, ウィジェットが入っているフラグメント関数, 操作)
+STEPS = [
+    ("p を選ぶ", "受信者", "recv_keygen", lambda at: _w(at, "selectbox", "recv_p").set_value(5003)),
+    ("q を選ぶ", "受信者", "recv_keygen", lambda at: _w(at, "selectbox", "recv_q").set_value(5009)),
+    ("e を入力", "受信者", "recv_keygen", lambda at: _w(at, "number_input", "recv_e").set_value(5011)),
+    ("鍵生成", "受信者", "recv_keygen", lambda at: _w(at, "button", "recv_gen").click()),
+    ("暗号文を入力", "受信者", "recv_decrypt", lambda at: _w(at, "text_area", "dec_c").set_value("AA==")),
+    ("復号", "受信者", "recv_decrypt", lambda at: _w(at, "button", "dec_btn").click()),
+    ("n を入力", "送信者", "send_encrypt", lambda at: _w(at, "text_input", "enc_n").set_value("25060027")),
+    ("e を入力 ", "送信者", "send_encrypt", lambda at: _w(at, "text_input", "enc_e").set_value("5011")),
+    ("平文を入力", "送信者", "send_encrypt", lambda at: _w(at, "text_input", "enc_msg").set_value("HELLO")),
+    ("暗号化", "送信者", "send_encrypt", lambda at: _w(at, "button", "enc_btn").click()),
+]
+
+
+def _w(at, kind, key):
+    return next(x for x in getattr(at, kind) if x.key == key)
+
+
+def _fragment_id(at, name: str):
+    # 登録済みのフラグメントのうち、関数名が name のものの ID（なければ None）
+    for fid, wrapped in at._fragment_storage._fragments.items():
+        for cell in wrapped.__closure__ or ():
+            if getattr(cell.cell_contents, "__name__", None) == name:
+                return fid
+    return None
+
+
+@contextmanager
+def _fragment_rerun(fragment_id):
+    # AppTest は常にページ全体を再実行するので、ブラウザがフラグメント内の
+    # 操作で送るのと同じ RerunData（fragment_id_queue 付き）に差し替える
+    original = local_script_runner.RerunData
+    if fragment_id is not None:
+        local_script_runner.RerunData = lambda **kw: original(fragment_id_queue=[fragment_id], **kw)
+    try:
+        yield
+    finally:
+        local_script_runner.RerunData = original
+
+
+def _refresh(at, before):
+    # フラグメントだけの再実行のあとは要素ツリーにフラグメントの中身しか残らない。
+    # ブラウザと同じく、外側のウィジェットの値は操作前のツリーから引き継いで
+    # ページ全体を取り直す（計測しない）
+    states = {w.id: w for w in before.get_widget_states().widgets}
+    states.update({w.id: w for w in at._tree.get_widget_states().widgets})
+    merged = WidgetStates()
+    merged.widgets.extend(states.values())
+    at._run(merged)
+
+
+def _cpu_run(at, fragment_id=None):
+    start = time.process_time()
+    with _fragment_rerun(fragment_id):
+        at.run()
+    return time.process_time() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=APP)
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--full-reruns", action="store_true", help="フラグメントを使わずページ全体を再実行する")
+    args = parser.parse_args(argv)
+    logging.disable(logging.CRITICAL)
+
+    sessions = {role: [] for role in ("受信者", "送信者")}
+    for role, apps in sessions.items():
+        for _ in range(args.sessions):
+            at = AppTest.from_file(args.app, default_timeout=60).run()
+            at.radio[0].set_value(role).run()
+            apps.append(at)
+
+    cpu = {name: [] for name, *_ in STEPS}
+    for name, role, fragment, action in STEPS:
+        for at in sessions[role]:
+            action(at)
+            before = at._tree
+            fid = None if args.full_reruns else _fragment_id(at, fragment)
+            cpu[name].append(_cpu_run(at, fid))
+            if at.exception:
+                raise SystemExit(f"{name}: {at.exception[0].value}")
+            if fid is not None:
+                _refresh(at, before)
+
+    total = 0.0
+    print(f"{'操作':<10} {'CPU ms (平均)':>14} {'CPU ms (p95)':>14}")
+    for name, times in cpu.items():
+        total += statistics.mean(times)
+        p95 = sorted(times)[int(0.95 * (len(times) - 1))]
+        print(f"{name:<10} {statistics.mean(times) * 1e3:>14.2f} {p95 * 1e3:>14.2f}")
+    print(f"{'合計':<10} {total * 1e3:>14.2f}   ({args.sessions} セッション × 2 役割, "
+          f"{'ページ全体' if args.full_reruns else 'フラグメント'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""教室 1 クラス分のセッションで rsa.py に負荷をかける（localhost だけで完結）。
+
+    pip install websockets          # このスクリプトだけが使う（アプリには不要）
+    python -m benchmarks.loadtest [--sessions 10 30 60] [--think 0.5]
+
+セッション数ごとに `streamlit run rsa.py` をこのマシンで起動し直し、その数の
+セッションを同時に WebSocket（/_stcore/stream）でつないで、受信者・送信者・
+一人で行うの流れ（鍵生成・暗号化・復号）を順番に割り当てて最後まで操作する。
+ブラウザと同じく、ウィジェットを 1 つ操作するたびに再実行を要求し、
+フラグメントの中のウィジェットならそのフラグメントだけを再実行させる。
+
+表示するもの: 再実行 1 回（要求から script_finished まで）の待ち時間の
+分位点、途中で失敗したセッションの割合、サーバープロセスの RSS の増加
+（セッションあたり）。負荷をかける側も同じマシンで動くので、CPU が
+少ない環境では待ち時間にその分も含まれる。
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from primeguard.codec import encrypt_blocks
+from primeguard.evalid import e_candidates
+from primeguard.numtheory import mod_inverse
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rsa.py")
+
+# 教材用の鍵（流れの中で入力する値）
+P, Q = 5003, 5009
+N = P * Q
+E = e_candidates((P - 1) * (Q - 1), P, Q)[0]
+D = mod_inverse(E, (P - 1) * (Q - 1))
+MESSAGE = "HELLO"
+CIPHER = encrypt_blocks(MESSAGE, N, E)
+
+RERUN = ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN
+FRAGMENT_DONE = ForwardMsg.ScriptFinishedStatus.FINISHED_FRAGMENT_RUN_SUCCESSFULLY
+
+
+class Session:
+    """ブラウザ 1 枚分。BackMsg で再実行を要求し、届いた ForwardMsg から
+    ウィジェット（ID・種類・所属するフラグメント）と表示内容を集める。"""
+
+    def __init__(self, url: str, timeout: float, think: float = 0, rng=None):
+        self.url = url
+        self.timeout = timeout
+        self.think = think
+        self.rng = rng
+        self.ws = None
+        self.widgets = {}  # ID → (種類, key, フラグメント ID, proto)
+        self.states = {}   # ID → 送り返す WidgetState
+        self.latencies = []  # (操作名, 秒)
+        self.success, self.codes = [], []
+
+    async def open(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        await self.rerun("開く")
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self, step: str, fragment_id: str = ""):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        seen, errors = {}, []
+        self.success, self.codes = [], []
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+            kind = fwd.WhichOneof("type")
+            if kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                self._element(fwd.delta.new_element, fwd.delta.fragment_id, seen, errors)
+            elif kind == "script_finished":
+                if fwd.script_finished != RERUN:
+                    break
+                # st.rerun() でページ全体の再実行が続く
+                seen, errors, fragment_id = {}, [], ""
+                self.success, self.codes = [], []
+        self.latencies.append((step, time.perf_counter() - start))
+
+        # ブラウザと同じく、画面から消えたウィジェットの値は送らない
+        if fwd.script_finished == FRAGMENT_DONE:
+            gone = [wid for wid, w in self.widgets.items() if w[2] == fragment_id and wid not in seen]
+        else:
+            gone = [wid for wid in self.widgets if wid not in seen]
+        for wid in gone:
+            del self.widgets[wid]
+            self.states.pop(wid, None)
+        self.widgets.update(seen)
+        for wid, state in list(self.states.items()):
+            if state.WhichOneof("value") == "trigger_value":
+                del self.states[wid]
+        if errors:
+            raise RuntimeError(f"{step}: {errors[0]}")
+
+    def _element(self, element, fragment_id, seen, errors):
+        kind = element.WhichOneof("type")
+        proto = getattr(element, kind)
+        wid = getattr(proto, "id", "")
+        if wid.startswith("$$ID"):
+            seen[wid] = (kind, wid.rsplit("-", 1)[1], fragment_id, proto)
+        elif kind == "alert" and proto.format == proto.ERROR:
+            errors.append(proto.body)
+        elif kind == "alert" and proto.format == proto.SUCCESS:
+            self.success.append(proto.body)
+        elif kind == "exception":
+            errors.append(f"{proto.type}: {proto.message}")
+        elif kind == "code":
+            self.codes.append(proto.code_text)
+
+    def _find(self, kind: str, key: str):
+        for wid, (k, wkey, fragment_id, proto) in self.widgets.items():
+            if k == kind and (wkey == key or kind == "radio" and key in proto.options):
+                return wid, fragment_id, proto
+        raise LookupError(f"{kind} {key!r} が画面にない")
+
+    async def set(self, step: str, kind: str, key: str, value):
+        """key のウィジェット（役割の radio は選択肢）に value を入れて再実行する。
+        think があれば、その前に 0〜think 秒待つ（考えている時間）。"""
+        if self.think:
+            await asyncio.sleep(self.rng.uniform(0, self.think))
+        wid, fragment_id, proto = self._find(kind, key)
+        state = WidgetState(id=wid)
+        if kind == "button":
+            state.trigger_value = True
+        elif kind == "number_input" and proto.data_type == proto.INT:
+            state.int_value = value
+        elif kind == "number_input":
+            state.double_value = value
+        else:
+            state.string_value = str(value)
+        self.states[wid] = state
+        await self.rerun(step, fragment_id)
+
+    async def click(self, step: str, key: str):
+        await self.set(step, "button", key, True)
+
+
+async def receiver(s: Session):
+    await s.set("役割を選ぶ", "radio", "受信者", "受信者")
+    await s.set("p, q, e を選ぶ", "selectbox", "recv_p", P)
+    await s.set("p, q, e を選ぶ", "selectbox", "recv_q", Q)
+    await s.set("p, q, e を選ぶ", "number_input", "recv_e", E)
+    await s.click("鍵生成", "recv_gen")
+    await s.set("暗号文を入力", "text_area", "dec_c", CIPHER)
+    await s.click("復号", "dec_btn")
+    _expect(s.success, MESSAGE)
+
+
+async def sender(s: Session):
+    await s.set("役割を選ぶ", "radio", "送信者", "送信者")
+    await s.set("n, e, 平文を入力", "text_input", "enc_n", N)
+    await s.set("n, e, 平文を入力", "text_input", "enc_e", E)
+    await s.set("n, e, 平文を入力", "text_input", "enc_msg", MESSAGE)
+    await s.click("暗号化", "enc_btn")
+    _expect(s.codes, CIPHER)
+
+
+async def solo(s: Session):
+    await s.set("役割を選ぶ", "radio", "一人で行う", "一人で行う")
+    await s.set("p, q, e を選ぶ", "selectbox", "solo_p", P)
+    await s.set("p, q, e を選ぶ", "selectbox", "solo_q", Q)
+    await s.set("p, q, e を選ぶ", "number_input", "solo_e", E)
+    await s.click("鍵生成", "solo_gen")
+    await s.set("n, e, 平文を入力", "text_input", "solo_enc_n", N)
+    await s.set("n, e, 平文を入力", "text_input", "solo_enc_e", E)
+    await s.set("n, e, 平文を入力", "text_input", "solo_plain1", MESSAGE)
+    await s.click("暗号化", "solo_enc_btn")
+    _expect(s.codes, CIPHER)
+    await s.set("n, d, 暗号文を入力", "text_input", "solo_dec_n", N)
+    await s.set("n, d, 暗号文を入力", "text_input", "solo_dec_d", D)
+    await s.set("n, d, 暗号文を入力", "text_area", "solo_dec_c", CIPHER)
+    await s.click("復号", "solo_dec_btn")
+    _expect(s.success, MESSAGE)
+
+
+FLOWS = [receiver, sender, solo]
+
+
+def _expect(shown, text: str):
+    if not any(text in s for s in shown):
+        raise AssertionError(f"{text!r} が表示されない")
+
+
+class Server:
+    """このマシンで `streamlit run` を起動し、終了時に止める。"""
+
+    def __init__(self, app: str):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", app, "--server.headless", "true",
+             "--server.address", "127.0.0.1", "--server.port", str(self.port),
+             "--server.fileWatcherType", "none", "--browser.gatherUsageStats", "false"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+
+    def wait_ready(self, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError("streamlit が起動しませんでした")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.2)
+        raise TimeoutError("streamlit の起動を待ちきれませんでした")
+
+    def rss(self):
+        """サーバーの現在の RSS（バイト）。/proc がなければ None。"""
+        try:
+            with open(f"/proc/{self.proc.pid}/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            return None
+
+    def __enter__(self):
+        self.wait_ready()
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+async def _user(url: str, flow, think: float, timeout: float, rng):
+    # 1 人分: つないで操作を最後まで行う（接続は閉じずに返す）
+    s = Session(url, timeout, think, rng)
+    try:
+        await s.open()
+        await flow(s)
+    except Exception as e:  # 1 人の失敗で全体を止めない
+        return s, f"{flow.__name__}: {type(e).__name__}: {e}"
+    return s, None
+
+
+def _percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _level(server: Server, sessions: int, think: float, timeout: float, seed: int):
+    # 最初の 1 人ずつ（キャッシュの準備）は数えない
+    for flow in FLOWS:
+        s, error = await _user(server.url, flow, 0, timeout, None)
+        await s.close()
+        if error:
+            raise RuntimeError(f"準備の操作に失敗しました: {error}")
+    base = server.rss()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_user(server.url, FLOWS[i % len(FLOWS)], think, timeout,
+                                           random.Random(seed + i)) for i in range(sessions)))
+    wall = time.perf_counter() - start
+    grown = server.rss() - base if base is not None else None  # 全員が接続したまま測る
+    for s, _ in results:
+        await s.close()
+    latencies = [(step, t) for s, _ in results for step, t in s.latencies]
+    by_step = {}
+    for step, t in latencies:
+        by_step.setdefault(step, []).append(t)
+    all_lat = [t for _, t in latencies]
+    return {
+        "sessions": sessions,
+        "runs": len(all_lat),
+        "errors": [err for _, err in results if err],
+        "p50": _percentile(all_lat, 0.50),
+        "p95": _percentile(all_lat, 0.95),
+        "p99": _percentile(all_lat, 0.99),
+        "max": max(all_lat),
+        "wall": wall,
+        "rss": grown,
+        "steps": {step: (statistics.median(t), _percentile(t, 0.95)) for step, t in by_step.items()},
+    }
+
+
+def run_level(app: str, sessions: int, think: float = 0.5, timeout: float = 60, seed: int = 0):
+    """新しく起動したサーバーに sessions 人で同時に操作したときの結果の辞書。"""
+    with Server(app) as server:
+        return asyncio.run(_level(server, sessions, think, timeout, seed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=APP)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 30, 60])
+    parser.add_argument("--think", type=float, default=0.5, help="操作の間の待ち時間の上限（秒）")
+    parser.add_argument("--timeout", type=float, default=60, help="再実行 1 回の待ち時間の上限（秒）")
+    parser.add_argument("--steps", action="store_true", help="操作ごとの中央値と p95 も表示する")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'sessions':>8} {'runs':>6} {'err %':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'wall s':>7} {'RSS MB':>7} {'KB/sess':>8}")
+    failures = []
+    for count in args.sessions:
+        r = run_level(args.app, count, args.think, args.timeout, args.seed)
+        err = 100 * len(r["errors"]) / count
+        rss = (f"{r['rss'] / 2**20:>7.1f} {r['rss'] / count / 1024:>8.0f}" if r["rss"] is not None
+               else f"{'-':>7} {'-':>8}")
+        print(f"{count:>8} {r['runs']:>6} {err:>6.1f} {r['p50'] * 1e3:>8.0f} {r['p95'] * 1e3:>8.0f} "
+              f"{r['p99'] * 1e3:>8.0f} {r['max'] * 1e3:>8.0f} {r['wall']:>7.1f} {rss}")
+        if args.steps:
+            for step, (p50, p95) in r["steps"].items():
+                print(f"{'':>8} {step:<16} p50 {p50 * 1e3:>7.0f} ms  p95 {p95 * 1e3:>7.0f} ms")
+        failures += r["errors"]
+    for err in dict.fromkeys(failures):
+        print("エラー:", err)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
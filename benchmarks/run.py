@@ -0,0 +1,218 @@
+"""篩・鍵生成・べき乗剰余・ブロック暗号化・素因数分解の総合ベンチマーク。
+
+    python -m benchmarks.run                       # quick プロファイル
+    python -m benchmarks.run --profile full -o base.json
+    python -m benchmarks.run -o new.json --compare base.json --threshold 0.10
+
+結果（各ケースの 1 回あたりの秒数の中央値・最小値）を JSON に書き出す。
+--compare を指定すると、基準の JSON より中央値が threshold 以上遅くなった
+ケースを表示し、終了コード 1 で終わる（コミット間の比較用）。
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from primeguard.codec import ALPHABET, decrypt_blocks, encrypt_blocks
+from primeguard.evalid import e_candidates
+from primeguard.factor import fermat, pollard_rho, random_semiprime, trial_division
+from primeguard.keygen import generate_keypair, key_from_primes
+from primeguard.numtheory import ladder_pow, mod_inverse
+from primeguard.primes import generate_primes, primes_in_range
+
+PROFILES = {
+    "quick": {
+        "sieve": [10**4, 10**5, 10**6],
+        "keygen": [26, 512, 1024],
+        "modexp": [26, 1024, 2048],
+        "codec": [5, 1000, 100_000],
+        "factor": [32, 48],
+    },
+    "full": {
+        "sieve": [10**4, 10**5, 10**6, 10**7, 10**8],
+        "keygen": [26, 512, 1024, 2048, 4096],
+        "modexp": [26, 512, 1024, 2048, 4096],
+        "codec": [5, 1000, 100_000, 1_000_000, 10_000_000],
+        "factor": [32, 48, 64],
+    },
+}
+
+# 1 ケースに使う時間の目安（秒）
+_TARGET = 0.5
+
+
+def _classroom_key(rng):
+    # アプリの教材用の鍵と同じく、5000〜6000 の素数と 5001〜5999 の e で作る
+    primes = list(primes_in_range(5000, 6000))
+    while True:
+        p, q = rng.sample(primes, 2)
+        es = e_candidates((p - 1) * (q - 1), p, q)
+        if es:
+            return key_from_primes(p, q, rng.choice(es))
+
+
+def _key(bits, rng):
+    return _classroom_key(rng) if bits <= 26 else generate_keypair(bits)
+
+
+def _cases(profile, seed: int, wanted):
+    """(ケース名, 計測する関数) のリスト。入力はすべてここで作り、計測は含めない。
+
+    乱数はグループごとに seed から作り直すので、入力は他のケースの呼び出し回数や
+    --filter に左右されない。wanted(名前) が偽のケースは入力も作らない。
+    """
+    sizes = PROFILES[profile]
+    cases = []
+
+    def add(name, fn):
+        if wanted(name):
+            cases.append((name, fn))
+
+    def rng(group):
+        return random.Random(f"{seed}/{group}")
+
+    for limit in sizes["sieve"]:
+        add(f"sieve/generate_primes/{limit:.0e}", lambda limit=limit: generate_primes(limit))
+
+    if wanted("mod_inverse/2048bit-x100"):
+        r = rng("mod_inverse")
+        phis = [(r.getrandbits(2048) | 1) << 1 for _ in range(100)]
+        add("mod_inverse/2048bit-x100", lambda: [mod_inverse(65537, m) for m in phis])
+
+    for bits in sizes["keygen"]:
+        if bits <= 26:
+            # この乱数は計測する関数だけが使う
+            add("keygen/classroom", lambda r=rng("keygen"): _classroom_key(r))
+        else:
+            add(f"keygen/{bits}", lambda bits=bits: generate_keypair(bits))
+
+    for bits in sizes["modexp"]:
+        names = (f"modexp/decrypt/{bits}", f"modexp/ladder/{bits}")
+        if not any(map(wanted, names)):
+            continue
+        r = rng(f"modexp/{bits}")
+        key = _key(bits, r)
+        c = pow(r.randrange(key.n), key.e, key.n)
+        add(names[0], lambda key=key, c=c: pow(c, key.d, key.n))
+        add(names[1], lambda key=key, c=c: ladder_pow(c, key.d, key.n))
+
+    keys = {}
+    for name, make in (("classroom", lambda: _key(26, rng("codec/key"))),
+                       ("1024-pack", lambda: generate_keypair(1024))):
+        if any(wanted(f"codec/{op}/{name}/{length}")
+               for op in ("encrypt", "decrypt") for length in sizes["codec"]):
+            keys[name] = make()
+    for length in sizes["codec"]:
+        msg = None
+        for name, pack in (("classroom", False), ("1024-pack", True)):
+            if name not in keys:
+                continue
+            k = keys[name]
+            if msg is None:
+                r = rng(f"codec/{length}")
+                msg = "".join(r.choice(ALPHABET) for _ in range(length))
+            b64 = encrypt_blocks(msg, k.n, k.e, pack=pack)
+            add(f"codec/encrypt/{name}/{length}",
+                lambda msg=msg, k=k, pack=pack: encrypt_blocks(msg, k.n, k.e, pack=pack))
+            add(f"codec/decrypt/{name}/{length}",
+                lambda b64=b64, k=k, pack=pack: decrypt_blocks(b64, k.n, k.d, k.crt, pack=pack))
+
+    for bits in sizes["factor"]:
+        names = (f"factor/trial/{bits}", f"factor/rho/{bits}", f"factor/fermat-near/{bits}")
+        if not any(map(wanted, names)):
+            continue
+        r = rng(f"factor/{bits}")
+        n = random_semiprime(bits, rng=r)
+        near = random_semiprime(bits, close=True, rng=r)
+        if bits <= 48:
+            add(names[0], lambda n=n: trial_division(n))
+        add(names[1], lambda n=n: pollard_rho(n, seed=0))
+        add(names[2], lambda near=near: fermat(near))
+    return cases
+
+
+def measure(fn, repeat: int):
+    """fn の 1 回あたりの秒数を repeat 回測り、(中央値, 最小値, 1 回の呼び出し数)。"""
+    start = time.perf_counter()
+    fn()
+    first = time.perf_counter() - start
+    number = max(1, int(_TARGET / repeat / max(first, 1e-9)))
+    if first > _TARGET:
+        repeat = min(repeat, 3)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times), min(times), number
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold: float):
+    """threshold 以上遅くなったケースの (名前, 基準, 今回, 比) のリスト。"""
+    slower = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base and res["median"] > base["median"] * (1 + threshold):
+            slower.append((name, base["median"], res["median"], res["median"] / base["median"]))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="名前にこの文字列を含むケースだけ実行")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="結果を書き出す JSON ファイル")
+    parser.add_argument("--compare", help="比較の基準にする JSON ファイル")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="遅くなったとみなす割合（既定 0.10 = 10%%）")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, fn in _cases(args.profile, args.seed, lambda name: args.filter in name):
+        median, best, number = measure(fn, args.repeat)
+        results[name] = {"median": median, "min": best, "number": number}
+        print(f"{name:<40} {median * 1e3:>12.4f} ms  (min {best * 1e3:.4f} ms)", flush=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "profile": args.profile,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        slower = compare(results, baseline, args.threshold)
+        for name, base, now, ratio in slower:
+            print(f"REGRESSION {name}: {base * 1e3:.4f} ms -> {now * 1e3:.4f} ms ({ratio:.2f}x)")
+        if slower:
+            sys.exit(1)
+        print(f"基準からの {args.threshold:.0%} 以上の悪化はありません。")
+
+
+if __name__ == "__main__":
+    main()
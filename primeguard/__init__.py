@@ -0,0 +1,83 @@
+"""PrimeGuard RSA の計算部分（Streamlit に依存しない）。
+
+rsa.py / rsaVer1.py のほか、バッチ処理やベンチマークからも使う。
+サブモジュールは名前に初めてアクセスしたときに読み込む（NumPy を使う
+evalid なども、使わなければ読み込まれない）。
+
+    from primeguard import encrypt_blocks, generate_keypair
+"""
+import importlib
+
+# 公開名 → 定義しているサブモジュール
+_EXPORTS = {
+    "primes_in_range": "primes",
+    "generate_primes": "primes",
+    "gcd": "numtheory",
+    "mod_inverse": "numtheory",
+    "mod_inverse_batch": "numtheory",
+    "crt_pow": "numtheory",
+    "Montgomery": "numtheory",
+    "ladder_pow": "numtheory",
+    "E_LO": "evalid",
+    "E_HI": "evalid",
+    "e_valid_mask": "evalid",
+    "e_candidates": "evalid",
+    "e_valid_matrix": "evalid",
+    "EValidator": "evalid",
+    "ALPHABET": "codec",
+    "CHAR_TO_VAL": "codec",
+    "VAL_TO_CHAR": "codec",
+    "PACK_BASE": "codec",
+    "STREAM_CHUNK": "codec",
+    "pack_width": "codec",
+    "check_plaintext": "codec",
+    "plain_values": "codec",
+    "EncryptionContext": "codec",
+    "encryption_context": "codec",
+    "encrypt_blocks": "codec",
+    "decrypt_blocks": "codec",
+    "encrypt_stream": "codec",
+    "decrypt_stream": "codec",
+    "HYBRID_MIN_BITS": "hybrid",
+    "oaep_encode": "hybrid",
+    "oaep_decode": "hybrid",
+    "hybrid_encrypt": "hybrid",
+    "hybrid_decrypt": "hybrid",
+    "KEY_SIZES": "keygen",
+    "DEFAULT_E": "keygen",
+    "RSAKey": "keygen",
+    "is_probable_prime": "keygen",
+    "random_prime": "keygen",
+    "key_from_primes": "keygen",
+    "generate_keypair": "keygen",
+    "generate_keypair_parallel": "keygen",
+    "trial_division": "factor",
+    "pollard_rho": "factor",
+    "fermat": "factor",
+    "random_semiprime": "factor",
+    "ExchangeService": "exchange",
+    "key_fingerprint": "multi",
+    "encrypt_for_recipients": "multi",
+    "KeyIndex": "keyindex",
+    "build_index": "keyindex",
+    "open_index": "keyindex",
+    "SessionStore": "session",
+    "decryption_timings": "timing",
+    "weight_exponents": "timing",
+    "leak_t": "timing",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # 次回からは通常の属性として見つかる
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,224 @@
+"""コマンドラインからのまとめて処理（鍵生成・暗号化・復号）。
+
+    python -m primeguard keygen --count 40 > keys.jsonl
+    python -m primeguard keygen --count 100 --bits 2048 --workers 8 > keys.jsonl
+    python -m primeguard encrypt messages.csv > cipher.jsonl
+    python -m primeguard decrypt cipher.jsonl > plain.jsonl
+    python -m primeguard encrypt-multi keys.csv --message HELLO > cipher.jsonl
+    python -m primeguard build-index
+
+入力は CSV（1 行目が列名）または JSONL。encrypt は n, e, message 列、
+decrypt は n, d, ciphertext 列、encrypt-multi は n, e 列（受信者の公開鍵）を
+読み、id 列があれば出力にも付ける。
+結果は 1 行ずつ JSONL で書き出すので、入力が何百万行あってもメモリに
+ためこまない。行ごとのエラーは {"error": ...} として出力し、処理は続ける。
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
+from .codec import CHAR_TO_VAL, PACK_BASE, decrypt_blocks, encrypt_blocks
+from .evalid import E_HI, E_LO
+from .keygen import DEFAULT_E, MIN_KEY_BITS, generate_keypair
+from .keyindex import DEFAULT_PATH, build_index
+from .multi import encrypt_for_recipients, key_fingerprint
+from .numtheory import gcd, mod_inverse
+from .primes import primes_in_range
+
+# 1 タスクで処理する行数（プロセス間通信の回数を減らす）
+BATCH_ROWS = 256
+# encrypt-multi で一度に読み込む受信者の数
+MULTI_ROWS = 4096
+
+
+def _ordered_imap(executor, fn, items, window: int):
+    """executor.map と同じく順番どおりに結果を返すが、先読みは window 件まで。"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _batches(rows, size: int):
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _read_rows(path: str, fmt: str):
+    # CSV / JSONL の各行を dict として 1 行ずつ返す
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "auto":
+            fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+@lru_cache(maxsize=1)
+def _classroom_primes():
+    return tuple(primes_in_range(5000, 6000))
+
+
+def _classroom_key(seed: int):
+    # 教材用の範囲（p, q: 5000〜6000、e: 5001〜5999）から鍵を 1 組作る
+    rng = random.Random(seed)
+    primes = _classroom_primes()
+    while True:
+        p, q = rng.sample(primes, 2)
+        phi = (p - 1) * (q - 1)
+        e = rng.randrange(E_LO, E_HI)
+        if gcd(e, phi) == 1 and e not in (p, q):
+            d = mod_inverse(e, phi)
+            return {"n": p * q, "e": e, "d": d, "p": p, "q": q}
+
+
+def _keygen_task(args):
+    index, bits, e, seed = args
+    if bits:
+        key = generate_keypair(bits, e)
+        return {"id": index, "n": key.n, "e": key.e, "d": key.d, "p": key.p, "q": key.q}
+    return {"id": index, **_classroom_key(seed)}
+
+
+def _row_result(row, fn):
+    out = {"id": row["id"]} if "id" in row else {}
+    try:
+        out.update(fn(row))
+    except (KeyError, TypeError, ValueError) as exc:
+        out["error"] = f"{type(exc).__name__}: {exc}"
+    return out
+
+
+def _encrypt_batch(args):
+    rows, pack = args
+    return [
+        _row_result(r, lambda r: {"ciphertext": encrypt_blocks(
+            str(r["message"]).upper(), int(r["n"]), int(r["e"]), pack=pack)})
+        for r in rows
+    ]
+
+
+def _decrypt_batch(args):
+    rows, pack = args
+    return [
+        _row_result(r, lambda r: {"plaintext": decrypt_blocks(
+            r["ciphertext"], int(r["n"]), int(r["d"]), pack=pack)})
+        for r in rows
+    ]
+
+
+def _write(out, record):
+    out.write(json.dumps(record, ensure_ascii=False))
+    out.write("\n")
+
+
+def _multi_row(row, ciphers):
+    fp = key_fingerprint(int(row["n"]), int(row["e"]))
+    if fp not in ciphers:
+        raise ValueError(f"n が小さすぎます（{PACK_BASE} 以上が必要）。")
+    return {"fingerprint": fp, "ciphertext": ciphers[fp]}
+
+
+def _encrypt_multi(args, executor, out):
+    message = args.message.upper()
+    start, count = time.perf_counter(), 0
+    for rows in _batches(_read_rows(args.input, args.format), MULTI_ROWS):
+        keys = []
+        for r in rows:
+            try:
+                n, e = int(r["n"]), int(r["e"])
+            except (KeyError, TypeError, ValueError):
+                continue  # 下で行ごとのエラーとして出力する
+            if n >= PACK_BASE or not args.pack:
+                keys.append((n, e))
+        ciphers = encrypt_for_recipients(message, keys, args.pack, executor)
+        for r in rows:
+            _write(out, _row_result(r, lambda r: _multi_row(r, ciphers)))
+        count += len(keys)
+    elapsed = time.perf_counter() - start
+    print(f"{count} recipients in {elapsed:.2f} s ({count / max(elapsed, 1e-9):.0f} recipients/sec)",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m primeguard", description=__doc__.splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="ワーカープロセス数（既定: CPU コア数）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_key = sub.add_parser("keygen", parents=[common], help="鍵をまとめて生成する")
+    p_key.add_argument("--count", type=int, required=True)
+    p_key.add_argument("--bits", type=int, default=0,
+                       help="n のビット数（省略時は 5000〜6000 の素数で作る教材用の鍵）")
+    p_key.add_argument("--e", type=int, default=DEFAULT_E, help="--bits 指定時の公開指数")
+    p_key.add_argument("--seed", type=int, default=None, help="教材用の鍵の乱数シード")
+
+    for name, help_text in (("encrypt", "CSV/JSONL の各行を暗号化する"),
+                            ("decrypt", "CSV/JSONL の各行を復号する")):
+        p = sub.add_parser(name, parents=[common], help=help_text)
+        p.add_argument("input", help="入力ファイル（- で標準入力）")
+        p.add_argument("--format", choices=("auto", "csv", "jsonl"), default="auto")
+        p.add_argument("--pack", action="store_true", help="複数文字を 1 ブロックにまとめる方式")
+
+    p_multi = sub.add_parser("encrypt-multi", parents=[common],
+                             help="同じ平文を CSV/JSONL の各公開鍵で暗号化する")
+    p_multi.add_argument("input", help="受信者の公開鍵のファイル（- で標準入力）")
+    p_multi.add_argument("--message", required=True, help="平文（A–Z と 0–9）")
+    p_multi.add_argument("--format", choices=("auto", "csv", "jsonl"), default="auto")
+    p_multi.add_argument("--pack", action="store_true", help="複数文字を 1 ブロックにまとめる方式")
+
+    p_idx = sub.add_parser("build-index", help="教材用の鍵の索引ファイルを作る")
+    p_idx.add_argument("-o", "--output", default=DEFAULT_PATH,
+                       help=f"出力先（既定: {DEFAULT_PATH}、環境変数 PRIMEGUARD_KEYINDEX で変更可）")
+
+    args = parser.parse_args(argv)
+    if args.command == "build-index":
+        print(build_index(args.output), file=sys.stderr)
+        return
+    if args.command == "keygen" and args.bits and args.bits < MIN_KEY_BITS:
+        parser.error(f"--bits は {MIN_KEY_BITS} 以上にしてください（0 で教材用の鍵）。")
+    if args.command != "keygen" and args.input != "-" and not os.path.isfile(args.input):
+        parser.error(f"入力ファイルが見つかりません: {args.input}")
+    if args.command == "encrypt-multi" and not all(c in CHAR_TO_VAL for c in args.message.upper()):
+        parser.error("--message は A–Z と 0–9 で指定してください。")
+    out = sys.stdout
+    window = 4 * args.workers
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        if args.command == "encrypt-multi":
+            _encrypt_multi(args, executor, out)
+        elif args.command == "keygen":
+            base = random.randrange(1 << 32) if args.seed is None else args.seed
+            tasks = ((i, args.bits, args.e, base + i) for i in range(args.count))
+            for record in _ordered_imap(executor, _keygen_task, tasks, window):
+                _write(out, record)
+        else:
+            fn = _encrypt_batch if args.command == "encrypt" else _decrypt_batch
+            tasks = ((batch, args.pack) for batch in
+                     _batches(_read_rows(args.input, args.format), BATCH_ROWS))
+            for records in _ordered_imap(executor, fn, tasks, window):
+                for record in records:
+                    _write(out, record)
+    out.flush()
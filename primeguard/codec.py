@@ -0,0 +1,238 @@
+"""ALPHABET 上の文字列と RSA ブロック（Base64）の相互変換。"""
+import base64
+import re
+from functools import lru_cache
+
+from .instrument import timed
+from .numtheory import crt_pow, gcd, ladder_pow
+
+# --- 文字集合（A-Z と 0-9 をサポート）---
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+CHAR_TO_VAL = {ch: i for i, ch in enumerate(ALPHABET)}
+VAL_TO_CHAR = list(ALPHABET)
+PACK_BASE = len(ALPHABET) + 1  # 複数文字をまとめるときの基数（0 は空き）
+ASCII_CODES = ALPHABET.encode("ascii")  # 値 → 文字コード（復号結果を bytearray に書くため）
+STREAM_CHUNK = 1 << 16  # ファイルを読み込む単位（文字数）
+_PLAIN = re.compile(f"[{ALPHABET}]*")
+
+
+def pack_width(n: int) -> int:
+    """1 ブロックに詰められる文字数 k（37^k ≤ n となる最大の k）。
+
+    各文字を 1〜36 の数字として 37 進数で並べる（0 は使わないので、
+    先頭の "A" も失われない）。
+    """
+    k, v = 0, PACK_BASE
+    while v <= n:
+        k += 1
+        v *= PACK_BASE
+    if k == 0:
+        raise ValueError(f"n が小さすぎます（{PACK_BASE} 以上が必要）。")
+    return k
+
+
+def check_plaintext(plaintext: str):
+    """plaintext に ALPHABET 以外の文字があれば ValueError。"""
+    if not _PLAIN.fullmatch(plaintext):
+        raise ValueError("平文は A–Z と 0–9 のみで入力してください。")
+
+
+def plain_values(plaintext: str, width: int = 0) -> list:
+    """平文をブロックの値のリストにする（ALPHABET 以外の文字は KeyError）。
+
+    width = 0 なら 1 文字ずつ（0〜35）、そうでなければ width 文字ずつ
+    37 進数（各桁 1〜36）にまとめる。
+    """
+    if not width:
+        return [CHAR_TO_VAL[c] for c in plaintext]
+    values = []
+    for i in range(0, len(plaintext), width):
+        v = 0
+        for c in plaintext[i:i + width]:
+            v = v * PACK_BASE + CHAR_TO_VAL[c] + 1
+        values.append(v)
+    return values
+
+
+# 1文字ずつの暗号化で一度に join する文字数
+_RUN = 4096
+
+
+class _PowTable(dict):
+    # 平文の値 → 暗号文ブロック（bytes）。初めて出た値だけ pow を計算する
+    __slots__ = ("n", "e", "size")
+
+    def __init__(self, n: int, e: int, size: int):
+        super().__init__()
+        self.n, self.e, self.size = n, e, size
+
+    def __missing__(self, v: int) -> bytes:
+        block = self[v] = pow(v, self.e, self.n).to_bytes(self.size, 'big')
+        return block
+
+
+class EncryptionContext:
+    """1 つの公開鍵 (n, e) での暗号化。
+
+    1文字ずつの方式では平文の値は 36 通りしかないので、各値の暗号文ブロックを
+    表に覚えておき、どんなに長い文でもべき乗剰余は最大 36 回で済ませる。
+    まとめる方式ではブロックがほとんど重複しないので、毎回 pow を計算する
+    （pow 自体が内部でウィンドウ法を使っている）。
+    """
+
+    def __init__(self, n: int, e: int):
+        self.n, self.e = n, e
+        self.size = (n.bit_length() + 7) // 8
+        self._chars = _PowTable(n, e, self.size)
+        self._width = None
+
+    @property
+    def width(self) -> int:
+        """まとめる方式で 1 ブロックに詰める文字数。"""
+        if self._width is None:
+            self._width = pack_width(self.n)
+        return self._width
+
+    def encrypt(self, plaintext: str, pack: bool = False) -> str:
+        if pack:
+            return self.encrypt_values(plain_values(plaintext, self.width), pack=True)
+        # 出力を先に確保し、_RUN 文字ずつ join した結果をその場に書き込む
+        # （全ブロック分の参照リストを作らない）。値への変換は plain_values(…, 0)
+        # と同じだが、途中のリストを作らないようここに書く
+        size, table = self.size, self._chars
+        buf = bytearray(len(plaintext) * size)
+        for i in range(0, len(plaintext), _RUN):
+            chunk = b''.join([table[CHAR_TO_VAL[c]] for c in plaintext[i:i + _RUN]])
+            buf[i * size:i * size + len(chunk)] = chunk
+        return base64.b64encode(buf).decode()
+
+    def encrypt_values(self, values, pack: bool = False) -> str:
+        """plain_values で変換済みの値を暗号化し、Base64 文字列で返す。"""
+        if not pack:
+            table = self._chars
+            return base64.b64encode(b''.join([table[v] for v in values])).decode()
+        size, n, e = self.size, self.n, self.e
+        buf = bytearray(len(values) * size)
+        for o, v in enumerate(values):
+            buf[o * size:(o + 1) * size] = pow(v, e, n).to_bytes(size, 'big')
+        return base64.b64encode(buf).decode()
+
+
+@lru_cache(maxsize=16)
+def encryption_context(n: int, e: int) -> EncryptionContext:
+    """(n, e) ごとの EncryptionContext（同じ鍵での呼び出しで表を使い回す）。"""
+    return EncryptionContext(n, e)
+
+
+@timed("encrypt_blocks")
+def encrypt_blocks(plaintext: str, n: int, e: int, pack: bool = False) -> str:
+    """ALPHABET 上の文字を1文字ずつ RSA で暗号化し、Base64 文字列で返す。
+
+    pack=True のときは n に収まるだけの文字を 1 ブロックにまとめて暗号化する。
+    """
+    return encryption_context(n, e).encrypt(plaintext, pack)
+
+
+def _unpack(m: int) -> str:
+    # 37 進数の各桁（1〜36）を文字に戻す
+    chars = []
+    while m:
+        m, r = divmod(m, PACK_BASE)
+        if r == 0:
+            raise ValueError("復号値が想定範囲外です（鍵の組み合わせを確認）。")
+        chars.append(VAL_TO_CHAR[r - 1])
+    if not chars:
+        raise ValueError("復号値が想定範囲外です（鍵の組み合わせを確認）。")
+    return ''.join(reversed(chars))
+
+
+@timed("decrypt_blocks")
+def decrypt_blocks(b64: str, n: int, d: int, crt=None, pack: bool = False,
+                   constant_time: bool = False) -> str:
+    """Base64 暗号文を復号し、ALPHABET の文字列に戻す。
+
+    crt に (p, q, dp, dq, qinv) を渡すと中国剰余定理で高速に復号する。
+    pack は暗号化のときと同じ値を指定する。constant_time=True なら pow の
+    代わりに ladder_pow（Montgomery ladder、2〜3 倍遅い）を使う。
+    """
+    modpow = ladder_pow if constant_time else pow
+    cb = base64.b64decode(b64)
+    size = (n.bit_length() + 7) // 8
+    if size == 0 or len(cb) % size != 0:
+        raise ValueError("ブロック長が一致しません（鍵 n が違う可能性）。")
+    if pack:
+        view = memoryview(cb)  # 大きなブロックをスライスしてもコピーしない
+        chars = []
+        for i in range(0, len(cb), size):
+            c = int.from_bytes(view[i:i + size], 'big')
+            chars.append(_unpack(crt_pow(c, *crt, modpow=modpow) if crt else modpow(c, d, n)))
+        return ''.join(chars)
+    # 1 ブロック = 1 文字なので、文字コードを確保済みの bytearray に直接書く
+    # （文字のリストを作らない）。同じ暗号文ブロックは何度も出るので、
+    # 復号は 1 回だけにしてブロックの bytes で引く。
+    out = bytearray(len(cb) // size)
+    seen = {}
+    j = 0
+    for i in range(0, len(cb), size):
+        block = cb[i:i + size]
+        code = seen.get(block)
+        if code is None:
+            c = int.from_bytes(block, 'big')
+            m = crt_pow(c, *crt, modpow=modpow) if crt else modpow(c, d, n)
+            if not (0 <= m < len(ALPHABET)):
+                raise ValueError("復号値が想定範囲外です（鍵の組み合わせを確認）。")
+            code = seen[block] = ASCII_CODES[m]
+        out[j] = code
+        j += 1
+    return out.decode('ascii')
+
+
+def _read_chunks(src, chunk_size: int):
+    # ファイル風オブジェクトから chunk_size ずつ読み、空白を除いた文字列を返す
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            return
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("ascii")
+        yield "".join(chunk.split())
+
+
+def encrypt_stream(src, n: int, e: int, pack: bool = False, chunk_size: int = STREAM_CHUNK):
+    """src の平文を少しずつ読み、Base64 暗号文を少しずつ返すジェネレータ。
+
+    Base64 を区切っても連結すれば同じになるよう、3 バイトの倍数になる
+    ブロック数ずつ encrypt_blocks に渡す。空白・改行は無視する。
+    """
+    size = (n.bit_length() + 7) // 8
+    unit = (pack_width(n) if pack else 1) * (3 // gcd(size, 3))
+    pending = ""
+    for chunk in _read_chunks(src, chunk_size):
+        pending += chunk.upper()
+        cut = len(pending) - len(pending) % unit
+        if cut:
+            head, pending = pending[:cut], pending[cut:]
+            check_plaintext(head)
+            yield encrypt_blocks(head, n, e, pack=pack)
+    if pending:
+        check_plaintext(pending)
+        yield encrypt_blocks(pending, n, e, pack=pack)
+
+
+def decrypt_stream(src, n: int, d: int, crt=None, pack: bool = False,
+                   chunk_size: int = STREAM_CHUNK, constant_time: bool = False):
+    """src の Base64 暗号文を少しずつ読み、復号した文字列を少しずつ返すジェネレータ。"""
+    size = (n.bit_length() + 7) // 8
+    if size == 0:
+        raise ValueError("ブロック長が一致しません（鍵 n が違う可能性）。")
+    # ブロック長と 3 バイトの公倍数ぶんの Base64 文字数ずつ復号する
+    unit = size * 3 // gcd(size, 3) * 4 // 3
+    pending = ""
+    for chunk in _read_chunks(src, chunk_size):
+        pending += chunk
+        cut = len(pending) - len(pending) % unit
+        if cut:
+            head, pending = pending[:cut], pending[cut:]
+            yield decrypt_blocks(head, n, d, crt, pack=pack, constant_time=constant_time)
+    if pending:
+        yield decrypt_blocks(pending, n, d, crt, pack=pack, constant_time=constant_time)
@@ -0,0 +1,145 @@
+"""公開鍵 e の妥当性判定（NumPy でまとめて計算する）。"""
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from .instrument import timed
+from .numtheory import gcd
+from .primes import primes_in_range
+
+# 教材用の e の範囲（5001〜5999）
+E_LO, E_HI = 5001, 6000
+
+
+def e_valid_mask(phi: int, p: int, q: int, lo: int = E_LO, hi: int = E_HI):
+    """lo ≤ e < hi の各 e が φ(n) と互いに素で p, q とも異なるかを表す bool 配列。
+
+    φ(n) が int64 に収まらない大きな鍵では gcd(e, φ(n)) = gcd(e, φ(n) mod e)
+    を使い、e ごとの余り（e 未満なので必ず収まる）で計算する。
+    """
+    phi = int(phi)
+    es = np.arange(lo, hi, dtype=np.int64)
+    if phi.bit_length() > 62:
+        phi = np.fromiter((phi % e for e in range(lo, hi)), dtype=np.int64, count=len(es))
+    mask = np.gcd(es, phi) == 1
+    for x in (p, q):
+        if lo <= x < hi:
+            mask[x - lo] = False
+    return mask
+
+
+@timed("e_candidates")
+def e_candidates(phi: int, p: int, q: int):
+    # 教材用：5001〜5999 から φ(n) と互いに素、かつ p,q と異なる値
+    return (np.arange(E_LO, E_HI)[e_valid_mask(phi, p, q)]).tolist()
+
+
+@timed("e_valid_matrix")
+def e_valid_matrix(primes: tuple, lo: int = E_LO, hi: int = E_HI):
+    """すべての (p, q, e) について e が使えるかを表す bool 配列（形は P×P×E）。
+
+    gcd(e, (p-1)(q-1)) = 1 は gcd(e, p-1) = 1 かつ gcd(e, q-1) = 1 と同じなので、
+    素数ごとの P×E 個の gcd だけを計算し、あとは論理積で組み合わせる。
+    """
+    ps = np.asarray(primes, dtype=np.int64)
+    es = np.arange(lo, hi, dtype=np.int64)
+    ok = (np.gcd(es[None, :], ps[:, None] - 1) == 1) & (es[None, :] != ps[:, None])
+    valid = ok[:, None, :] & ok[None, :, :]
+    valid[np.arange(len(ps)), np.arange(len(ps)), :] = False  # p = q は不可
+    valid.flags.writeable = False
+    return valid
+
+
+@lru_cache(maxsize=4)
+def _primes_below(limit: int) -> tuple:
+    return tuple(primes_in_range(2, limit - 1))
+
+
+@lru_cache(maxsize=256)
+def _prime_factors_below(m: int, limit: int) -> tuple:
+    # m の素因数のうち limit 未満のもの（e の範囲に倍数が入りうるものだけ）
+    found = []
+    for f in _primes_below(limit):
+        if f * f > m:
+            break
+        if m % f == 0:
+            found.append(f)
+            while m % f == 0:
+                m //= f
+    if 1 < m < limit:
+        found.append(m)
+    return tuple(found)
+
+
+class EValidator:
+    """今の (p, q) で使える e の表。p, q が変わったときだけ作り直す。
+
+    e が φ(n) = (p-1)(q-1) と互いに素でないのは、e が φ(n) の素因数の倍数の
+    ときなので、lo ≤ e < hi の bytearray を 1 で埋め、p-1 と q-1 の hi 未満の
+    素因数それぞれの倍数の位置をスライス代入でまとめて 0 にする。
+    1 つの e の判定は O(1)、最も近い使える e は bytearray の find で探す。
+
+        v = EValidator()
+        v.update(p, q)
+        v.is_valid(e), v.nearest(e)
+    """
+
+    __slots__ = ("lo", "hi", "p", "q", "phi", "_valid", "_zeros", "_candidates")
+
+    def __init__(self, lo: int = E_LO, hi: int = E_HI):
+        self.lo, self.hi = lo, hi
+        self.p = self.q = self.phi = None
+        self._valid = bytearray(hi - lo)
+        self._zeros = memoryview(bytes(hi - lo))
+        self._candidates = None
+
+    @timed("EValidator.update")
+    def update(self, p: int, q: int) -> bool:
+        """(p, q) が前回と違えば表を作り直して True を返す。"""
+        if (p, q) == (self.p, self.q):
+            return False
+        lo, hi, size = self.lo, self.hi, self.hi - self.lo
+        valid = self._valid
+        valid[:] = b"\x01" * size
+        for f in set(_prime_factors_below(p - 1, hi) + _prime_factors_below(q - 1, hi)):
+            start = -lo % f  # lo 以上で最初の f の倍数の位置
+            if start < size:
+                valid[start::f] = self._zeros[:(size - 1 - start) // f + 1]
+        for bad in (0, 1, p, q):
+            if lo <= bad < hi:
+                valid[bad - lo] = 0
+        self.p, self.q, self.phi = p, q, (p - 1) * (q - 1)
+        self._candidates = None
+        return True
+
+    def is_valid(self, e: int) -> bool:
+        """e が φ(n) と互いに素で、p, q とも異なるか（範囲外の e は gcd で判定）。"""
+        if self.lo <= e < self.hi:
+            return self._valid[e - self.lo] == 1
+        return e > 1 and gcd(e, self.phi) == 1 and e not in (self.p, self.q)
+
+    def nearest(self, e: int):
+        """範囲内で e に最も近い使える e（同じ距離なら小さい方）。なければ None。"""
+        i = min(max(e - self.lo, 0), len(self._valid))
+        below = self._valid.rfind(1, 0, i + 1)
+        above = self._valid.find(1, i)
+        if below < 0 and above < 0:
+            return None
+        if above < 0 or (below >= 0 and i - below <= above - i):
+            return self.lo + below
+        return self.lo + above
+
+    def candidates(self):
+        """範囲内の使える e のリスト（小さい順）。次に表が変わるまで使い回す。"""
+        if self._candidates is None:
+            idx = np.flatnonzero(np.frombuffer(self._valid, dtype=np.uint8))
+            self._candidates = (idx + self.lo).tolist()
+        return self._candidates
+
+    def __len__(self):
+        return self._valid.count(1)
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + sys.getsizeof(self._valid)
+                + sys.getsizeof(self._candidates or ()))
@@ -0,0 +1,143 @@
+"""受信者と送信者の間で公開鍵と暗号文をやりとりする掲示板（同じプロセス内）。
+
+受信者は公開鍵を登録して受信箱を作り、送信者はその受信箱に暗号文を送る。
+データはすべて専用スレッドで動く asyncio のイベントループが持ち、
+呼び出し側のスレッド（Streamlit のスクリプトなど）はコルーチンを
+ループに渡して結果を待つだけなので、ロックを使わず、互いを止めない。
+
+    service = ExchangeService()
+    box = service.publish("Aさん", n, e)
+    service.post(box, ciphertext, sender="Bさん")
+    service.fetch(box, since=0)            # → [{"seq": 1, ...}]
+
+asyncio のコードからは apublish / apost / afetch / await_messages を直接使える。
+"""
+import asyncio
+import secrets
+import threading
+import time
+from collections import deque
+
+# 1 つの受信箱に残す暗号文の数（古いものから消える）
+MAX_MESSAGES = 50
+# 受信箱の数の上限と、使われなくなった受信箱を消すまでの秒数
+MAX_MAILBOXES = 2000
+MAILBOX_TTL = 2 * 60 * 60
+# 1 通の暗号文の最大文字数
+MAX_CIPHERTEXT = 64 * 1024
+# 同期 API で結果を待つ最大秒数
+CALL_TIMEOUT = 5.0
+
+
+class _Mailbox:
+    __slots__ = ("name", "n", "e", "messages", "seq", "touched", "changed")
+
+    def __init__(self, name: str, n: int, e: int):
+        self.name, self.n, self.e = name, n, e
+        self.messages = deque(maxlen=MAX_MESSAGES)
+        self.seq = 0
+        self.touched = time.monotonic()
+        self.changed = asyncio.Condition()
+
+
+class ExchangeService:
+    """公開鍵の掲示板と受信箱。スレッドセーフな同期 API と asyncio API を持つ。"""
+
+    def __init__(self, max_mailboxes: int = MAX_MAILBOXES, ttl: float = MAILBOX_TTL):
+        self.max_mailboxes = max_mailboxes
+        self.ttl = ttl
+        self._boxes = {}  # 受信箱 ID → _Mailbox（ループのスレッドだけが触る）
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        name="primeguard-exchange", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _call(self, coro, timeout: float = CALL_TIMEOUT):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def _box(self, box_id: str) -> _Mailbox:
+        box = self._boxes.get(box_id)
+        if box is None:
+            raise KeyError(f"受信箱が見つかりません: {box_id}")
+        box.touched = time.monotonic()
+        return box
+
+    def _expire(self):
+        now = time.monotonic()
+        for box_id in [k for k, b in self._boxes.items() if now - b.touched > self.ttl]:
+            del self._boxes[box_id]
+        # それでも多すぎるときは使われていない順に消す
+        excess = len(self._boxes) - self.max_mailboxes + 1
+        if excess > 0:
+            for box_id in sorted(self._boxes, key=lambda k: self._boxes[k].touched)[:excess]:
+                del self._boxes[box_id]
+
+    # --- asyncio API（ループのスレッドで実行される） ---
+
+    async def apublish(self, name: str, n: int, e: int) -> str:
+        """公開鍵 (n, e) を登録し、新しい受信箱の ID を返す。"""
+        self._expire()
+        box_id = secrets.token_urlsafe(6)
+        self._boxes[box_id] = _Mailbox(name.strip() or "名前なし", int(n), int(e))
+        return box_id
+
+    async def akeys(self):
+        """登録されている公開鍵の一覧（新しい順）。"""
+        return [
+            {"id": k, "name": b.name, "n": b.n, "e": b.e}
+            for k, b in sorted(self._boxes.items(), key=lambda kv: -kv[1].touched)
+        ]
+
+    async def apost(self, box_id: str, ciphertext: str, sender: str = "", mode: str = "") -> int:
+        """受信箱に暗号文を送り、その通し番号を返す。"""
+        if len(ciphertext) > MAX_CIPHERTEXT:
+            raise ValueError(f"暗号文が長すぎます（最大 {MAX_CIPHERTEXT} 文字）。")
+        box = self._box(box_id)
+        box.seq += 1
+        box.messages.append({
+            "seq": box.seq,
+            "sender": sender.strip() or "名前なし",
+            "mode": mode,
+            "ciphertext": ciphertext,
+            "time": time.time(),
+        })
+        async with box.changed:
+            box.changed.notify_all()
+        return box.seq
+
+    async def afetch(self, box_id: str, since: int = 0):
+        """通し番号が since より大きい暗号文のリスト。"""
+        box = self._box(box_id)
+        return [m for m in box.messages if m["seq"] > since]
+
+    async def await_messages(self, box_id: str, since: int = 0, timeout: float = 30.0):
+        """since より新しい暗号文が届くまで（最大 timeout 秒）待って返す。"""
+        box = self._box(box_id)
+        async with box.changed:
+            try:
+                await asyncio.wait_for(box.changed.wait_for(lambda: box.seq > since), timeout)
+            except asyncio.TimeoutError:
+                return []
+        return [m for m in box.messages if m["seq"] > since]
+
+    # --- 同期 API（どのスレッドからでも呼べる） ---
+
+    def publish(self, name: str, n: int, e: int) -> str:
+        return self._call(self.apublish(name, n, e))
+
+    def keys(self):
+        return self._call(self.akeys())
+
+    def post(self, box_id: str, ciphertext: str, sender: str = "", mode: str = "") -> int:
+        return self._call(self.apost(box_id, ciphertext, sender, mode))
+
+    def fetch(self, box_id: str, since: int = 0):
+        return self._call(self.afetch(box_id, since))
+
+    def wait(self, box_id: str, since: int = 0, timeout: float = 30.0):
+        return self._call(self.await_messages(box_id, since, timeout), timeout + CALL_TIMEOUT)
@@ -0,0 +1,170 @@
+"""公開鍵 n の素因数分解（試し割り・Pollard の rho 法・Fermat 法）。
+
+鍵のビット数が増えると分解にかかる時間がどう伸びるかを見せるための実装。
+どの関数も n の自明でない約数を 1 つ返し、見つからなければ None を返す。
+
+    trial_division   小さい素数の表 + 2·3·5·7 の車輪で √n まで割る
+    pollard_rho      Brent 版。gcd は RHO_BATCH 回分の積をまとめて 1 回だけ取る
+    fermat           p と q が近いときに速い。平方数の判定を剰余表で先に絞る
+"""
+import random
+import time
+from math import gcd, isqrt
+
+from .instrument import timed
+from .keygen import SMALL_PRIMES, is_probable_prime
+
+# rho 法で gcd をまとめて取る間隔
+RHO_BATCH = 128
+
+# 2·3·5·7 の車輪: 210 と互いに素な剰余（1 から）の間の差
+_RESIDUES = [x for x in range(1, 211) if gcd(x, 210) == 1]
+_WHEEL = tuple(b - a for a, b in zip(_RESIDUES, _RESIDUES[1:] + [_RESIDUES[0] + 210]))
+
+# 平方剰余の表（x が平方数でなければ、多くの場合ここで弾ける）
+_SQUARE_MODS = tuple((m, frozenset(i * i % m for i in range(m))) for m in (64, 63, 65, 11))
+
+
+def _is_square(x: int):
+    for m, residues in _SQUARE_MODS:
+        if x % m not in residues:
+            return None
+    r = isqrt(x)
+    return r if r * r == x else None
+
+
+def trial_division(n: int, limit: int = None):
+    """√n（または limit）以下の最小の素因数。"""
+    limit = isqrt(n) if limit is None else min(limit, isqrt(n))
+    for p in SMALL_PRIMES:
+        if p > limit:
+            return None
+        if n % p == 0:
+            return p if p != n else None
+    # 表より先は 210 の車輪で候補を作る（2, 3, 5, 7 の倍数を飛ばす）
+    f = (SMALL_PRIMES[-1] // 210) * 210 + 1
+    i = 0
+    while f <= SMALL_PRIMES[-1]:
+        f += _WHEEL[i]
+        i = (i + 1) % len(_WHEEL)
+    wheel = _WHEEL
+    size = len(wheel)
+    while f <= limit:
+        if n % f == 0:
+            return f
+        f += wheel[i]
+        i += 1
+        if i == size:
+            i = 0
+    return None
+
+
+def pollard_rho(n: int, seed: int = None, max_iter: int = 1 << 26):
+    """Pollard の rho 法（Brent の改良版）で n の約数を探す。"""
+    if n % 2 == 0:
+        return 2
+    rng = random.Random(seed)
+    while True:
+        y, c = rng.randrange(1, n), rng.randrange(1, n)
+        g = r = q = 1
+        steps = 0
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(RHO_BATCH, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += RHO_BATCH
+            r <<= 1
+            steps += r
+            if steps > max_iter:
+                return None
+        if g == n:
+            # まとめた積が n の倍数になったときは 1 歩ずつ戻って探し直す
+            while True:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+                if g > 1:
+                    break
+        if g != n:
+            return g
+
+
+def fermat(n: int, max_steps: int = 1 << 20):
+    """Fermat 法: n = a² − b² = (a − b)(a + b) となる a を √n から上へ探す。"""
+    if n % 2 == 0:
+        return 2
+    a = isqrt(n)
+    if a * a == n:
+        return a
+    a += 1
+    r = a * a - n
+    for _ in range(max_steps):
+        b = _is_square(r)
+        if b is not None:
+            return a - b
+        r += 2 * a + 1
+        a += 1
+    return None
+
+
+METHODS = {
+    "trial": trial_division,
+    "rho": pollard_rho,
+    "fermat": fermat,
+}
+
+
+@timed("factor")
+def factor(n: int, method: str = "rho"):
+    """METHODS の方法で n = p × q に分解し、(p, q, 秒数) を返す。失敗なら p, q は None。"""
+    start = time.perf_counter()
+    f = METHODS[method](n)
+    elapsed = time.perf_counter() - start
+    if not f or f in (1, n):
+        return None, None, elapsed
+    p, q = sorted((f, n // f))
+    return p, q, elapsed
+
+
+def random_semiprime(bits: int, close: bool = False, rng=None):
+    """およそ bits ビットの n = p × q。close=True なら p と q を隣り合う素数にする。"""
+    rng = rng or random.Random()
+    half = max(bits // 2, 3)
+
+    def next_prime(x):
+        x |= 1
+        while not is_probable_prime(x):
+            x += 2
+        return x
+
+    p = next_prime(rng.getrandbits(half) | (1 << (half - 1)))
+    q = next_prime(p + 2) if close else next_prime(rng.getrandbits(bits - half) | (1 << (bits - half - 1)))
+    while q == p:
+        q = next_prime(q + 2)
+    return p * q
+
+
+def scaling(bits_list, methods=("trial", "rho", "fermat"), budget: float = 1.0, seed: int = 0):
+    """ビット数ごとの分解時間 {method: [(bits, 秒数), ...]}。
+
+    Fermat 法は近い p, q の n で測る。1 回が budget 秒を超えた方法は
+    それより大きいビット数では測らない。
+    """
+    rng = random.Random(seed)
+    result = {m: [] for m in methods}
+    for bits in bits_list:
+        far = random_semiprime(bits, rng=rng)
+        near = random_semiprime(bits, close=True, rng=rng)
+        for m in methods:
+            points = result[m]
+            if points and points[-1][1] > budget:
+                continue
+            _, _, elapsed = factor(near if m == "fermat" else far, m)
+            points.append((bits, elapsed))
+    return result
@@ -0,0 +1,97 @@
+"""ハイブリッド暗号: 共通鍵を RSA-OAEP で包み、本文は共通鍵で暗号化する。"""
+import base64
+import hashlib
+import hmac
+import secrets
+
+from .instrument import timed
+from .numtheory import crt_pow, ladder_pow
+
+HYBRID_MIN_BITS = 1024  # OAEP (SHA-256) で 32 バイトの共通鍵を包める鍵長
+OAEP_LHASH = hashlib.sha256(b"").digest()
+
+
+def _mgf1(seed: bytes, length: int) -> bytes:
+    # RFC 8017 のマスク生成関数 MGF1（SHA-256）
+    out = b"".join(
+        hashlib.sha256(seed + i.to_bytes(4, "big")).digest()
+        for i in range(-(-length // 32))
+    )
+    return out[:length]
+
+
+def oaep_encode(message: bytes, k: int) -> bytes:
+    """RSAES-OAEP（SHA-256、ラベルなし）で k バイトのブロックに符号化する。"""
+    h_len = 32
+    if len(message) > k - 2 * h_len - 2:
+        raise ValueError("n が小さすぎて OAEP で包めません。")
+    db = OAEP_LHASH + b"\x00" * (k - len(message) - 2 * h_len - 2) + b"\x01" + message
+    seed = secrets.token_bytes(h_len)
+    masked_db = bytes(a ^ b for a, b in zip(db, _mgf1(seed, k - h_len - 1)))
+    masked_seed = bytes(a ^ b for a, b in zip(seed, _mgf1(masked_db, h_len)))
+    return b"\x00" + masked_seed + masked_db
+
+
+def oaep_decode(block: bytes) -> bytes:
+    """oaep_encode の逆。形式が正しくなければ ValueError。"""
+    h_len = 32
+    k = len(block)
+    if k < 2 * h_len + 2:
+        raise ValueError("n が小さすぎて OAEP で包めません。")
+    masked_seed, masked_db = block[1:1 + h_len], block[1 + h_len:]
+    seed = bytes(a ^ b for a, b in zip(masked_seed, _mgf1(masked_db, h_len)))
+    db = bytes(a ^ b for a, b in zip(masked_db, _mgf1(seed, k - h_len - 1)))
+    sep = db.find(b"\x01", h_len)
+    # どこで失敗したかを区別しない（パディングオラクル対策）
+    if block[0] != 0 or not hmac.compare_digest(db[:h_len], OAEP_LHASH) or sep < 0 \
+            or db[h_len:sep].strip(b"\x00"):
+        raise ValueError("復号に失敗しました（鍵の組み合わせを確認）。")
+    return db[sep + 1:]
+
+
+def _keystream_xor(key: bytes, nonce: bytes, data: bytes) -> bytes:
+    # SHAKE-256 の出力を鍵ストリームとして XOR する（暗号化と復号は同じ処理）
+    stream = hashlib.shake_256(key + nonce).digest(len(data))
+    x = int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")
+    return x.to_bytes(len(data), "big")
+
+
+@timed("hybrid_encrypt")
+def hybrid_encrypt(plaintext: str, n: int, e: int) -> str:
+    """ランダムな共通鍵を RSA-OAEP で包み、本文はその共通鍵で暗号化する。
+
+    RSA の計算は共通鍵 1 回分だけなので、本文の長さによらず速い。
+    n が HYBRID_MIN_BITS ビット未満なら ValueError。出力は Base64(RSA ブロック ‖ nonce ‖ MAC ‖ 本文の暗号文)。
+    """
+    if n.bit_length() < HYBRID_MIN_BITS:
+        raise ValueError(f"ハイブリッド方式には {HYBRID_MIN_BITS} ビット以上の鍵が必要です。")
+    size = (n.bit_length() + 7) // 8
+    session_key = secrets.token_bytes(32)
+    wrapped = pow(int.from_bytes(oaep_encode(session_key, size), "big"), e, n)
+    enc_key = hmac.digest(session_key, b"enc", "sha256")
+    mac_key = hmac.digest(session_key, b"mac", "sha256")
+    nonce = secrets.token_bytes(16)
+    body = _keystream_xor(enc_key, nonce, plaintext.encode("utf-8"))
+    tag = hmac.digest(mac_key, nonce + body, "sha256")
+    return base64.b64encode(wrapped.to_bytes(size, "big") + nonce + tag + body).decode()
+
+
+@timed("hybrid_decrypt")
+def hybrid_decrypt(b64: str, n: int, d: int, crt=None, constant_time: bool = False) -> str:
+    """hybrid_encrypt の暗号文を復号する。crt と constant_time は decrypt_blocks と同じ。"""
+    modpow = ladder_pow if constant_time else pow
+    cb = base64.b64decode(b64)
+    size = (n.bit_length() + 7) // 8
+    if len(cb) < size + 48:
+        raise ValueError("暗号文が短すぎます（方式や鍵 n を確認）。")
+    c = int.from_bytes(cb[:size], "big")
+    m = crt_pow(c, *crt, modpow=modpow) if crt else modpow(c, d, n)
+    if m >= 1 << (8 * size):
+        raise ValueError("復号に失敗しました（鍵の組み合わせを確認）。")
+    session_key = oaep_decode(m.to_bytes(size, "big"))
+    enc_key = hmac.digest(session_key, b"enc", "sha256")
+    mac_key = hmac.digest(session_key, b"mac", "sha256")
+    nonce, tag, body = cb[size:size + 16], cb[size + 16:size + 48], cb[size + 48:]
+    if not hmac.compare_digest(tag, hmac.digest(mac_key, nonce + body, "sha256")):
+        raise ValueError("暗号文が改ざんされているか、鍵が違います。")
+    return _keystream_xor(enc_key, nonce, body).decode("utf-8")
@@ -0,0 +1,115 @@
+"""処理時間の計測（呼び出し回数とレイテンシのヒストグラム）。
+
+環境変数 PRIMEGUARD_INSTRUMENT=1 を設定して起動したときだけ有効になる。
+
+    PRIMEGUARD_INSTRUMENT=1 streamlit run rsa.py
+
+無効のときは @timed がもとの関数をそのまま返すので、計測のための
+余分な処理はない。ジェネレータ関数では、値を作っている間（next の中）の
+時間だけを合計して、最後まで読まれたとき（または閉じられたとき）に記録する。
+集計はプロセス単位で、render_prometheus() で Prometheus のテキスト形式に出力できる。
+"""
+import inspect
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+ENABLED = os.environ.get("PRIMEGUARD_INSTRUMENT", "").lower() in ("1", "true", "yes", "on")
+
+# ヒストグラムの上限値（秒）
+BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0, float("inf"))
+
+_lock = threading.Lock()
+_stats = {}  # 名前 → [回数, 合計秒, バケットごとの回数]
+
+
+def observe(name: str, seconds: float):
+    """name の処理に seconds 秒かかったことを記録する。"""
+    i = bisect_left(BUCKETS, seconds)
+    with _lock:
+        st = _stats.get(name)
+        if st is None:
+            st = _stats[name] = [0, 0.0, [0] * len(BUCKETS)]
+        st[0] += 1
+        st[1] += seconds
+        st[2][i] += 1
+
+
+def timed(name: str = None):
+    """関数の呼び出しを計測するデコレータ。無効のときは関数をそのまま返す。"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+        if inspect.isgeneratorfunction(fn):
+            return _timed_generator(fn, label)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def _timed_generator(fn, label: str):
+    # 呼び出し側が値を使っている時間は含めない
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        it = fn(*args, **kwargs)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    value = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield value
+        finally:
+            it.close()
+            observe(label, elapsed)
+    return wrapper
+
+
+def snapshot():
+    """名前ごとの {count, total, mean, buckets} の辞書。"""
+    with _lock:
+        return {
+            name: {
+                "count": count,
+                "total": total,
+                "mean": total / count if count else 0.0,
+                "buckets": dict(zip(BUCKETS, buckets)),
+            }
+            for name, (count, total, buckets) in sorted(_stats.items())
+        }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def render_prometheus(metric: str = "primeguard_op_duration_seconds") -> str:
+    """集計を Prometheus のテキスト形式（histogram）で返す。"""
+    lines = [
+        f"# HELP {metric} Time spent in PrimeGuard RSA operations.",
+        f"# TYPE {metric} histogram",
+    ]
+    for name, st in snapshot().items():
+        cumulative = 0
+        for le, n in st["buckets"].items():
+            cumulative += n
+            bound = "+Inf" if le == float("inf") else repr(le)
+            lines.append(f'{metric}_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{op="{name}"}} {st["total"]}')
+        lines.append(f'{metric}_count{{op="{name}"}} {st["count"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,226 @@
+"""大きな素数を使った RSA 鍵生成。
+
+小さな素数による篩（試し割り）で候補を絞り込み、残った候補だけに
+Miller–Rabin 法を適用して 512〜4096 ビットの鍵を作る。
+"""
+import os
+import secrets
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import gcd
+from typing import NamedTuple
+
+from .instrument import timed
+from .primes import generate_primes
+
+KEY_SIZES = (512, 1024, 2048, 4096)
+DEFAULT_E = 65537
+# random_prime が作れる最小のビット数（これ未満の候補は SMALL_PRIMES 自身と区別できない）
+MIN_PRIME_BITS = 17
+# generate_keypair が作れる最小の n のビット数
+MIN_KEY_BITS = 2 * MIN_PRIME_BITS
+
+# 試し割りに使う小さな素数（2^16 未満）
+SMALL_PRIMES = tuple(generate_primes((1 << 16) - 1))
+# 各素数 p に対する 2 の逆元 (p + 1) / 2（篩の開始位置の計算用）
+_HALF_INV = tuple((p, (p + 1) // 2) for p in SMALL_PRIMES[1:])
+
+# 3.3 × 10^24 未満はこの底で確定的に判定できる
+_DETERMINISTIC_LIMIT = 3317044064679887385961981
+_DETERMINISTIC_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+# 候補を篩う窓の大きさ（奇数の個数）
+_WINDOW = 4096
+# 並列探索で 1 タスクが受け持つ候補数
+_CHUNK = 4
+
+
+class RSAKey(NamedTuple):
+    """RSA 鍵一式。dp, dq, qinv は CRT（中国剰余定理）による復号用。"""
+    n: int
+    e: int
+    d: int
+    p: int
+    q: int
+    dp: int
+    dq: int
+    qinv: int
+
+    @property
+    def crt(self):
+        """CRT 復号用の (p, q, dp, dq, qinv)。"""
+        return (self.p, self.q, self.dp, self.dq, self.qinv)
+
+
+def _mr_rounds(bits: int) -> int:
+    # FIPS 186-4 表 C.3（誤り確率 2^-100）にならう
+    if bits >= 1536:
+        return 3
+    if bits >= 1024:
+        return 4
+    if bits >= 512:
+        return 7
+    return 40
+
+
+def _miller_rabin(n: int, bases) -> bool:
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def is_probable_prime(n: int, rounds: int = None) -> bool:
+    """n が素数なら True（3.3 × 10^24 以上は確率的判定）。"""
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+        if p * p > n:
+            return True
+    return _passes_miller_rabin(n, rounds)
+
+
+def _passes_miller_rabin(n: int, rounds: int = None) -> bool:
+    # 試し割り済みの奇数 n に対する Miller–Rabin 判定
+    if n < _DETERMINISTIC_LIMIT:
+        return _miller_rabin(n, _DETERMINISTIC_BASES)
+    rounds = rounds or _mr_rounds(n.bit_length())
+    # 最初は底 2（合成数の大半はここで落ちる）、残りはランダムな底
+    bases = [2] + [secrets.randbelow(n - 3) + 2 for _ in range(rounds - 1)]
+    return _miller_rabin(n, bases)
+
+
+def _sieve_window(start: int):
+    """start から始まる奇数 _WINDOW 個のうち、小さな素数で割り切れないもののオフセット。"""
+    window = bytearray(b"\x01") * _WINDOW
+    for p, half in _HALF_INV:
+        # start + 2i ≡ 0 (mod p) となる最小の i
+        i = -start * half % p
+        if i < _WINDOW:
+            window[i::p] = bytes((_WINDOW - 1 - i) // p + 1)
+    i = window.find(1)
+    while i != -1:
+        yield 2 * i
+        i = window.find(1, i + 1)
+
+
+def random_prime(bits: int, e: int = DEFAULT_E) -> int:
+    """ちょうど bits ビットで、gcd(e, p-1) = 1 を満たす素数を返す。"""
+    if bits < MIN_PRIME_BITS:
+        raise ValueError(f"bits は {MIN_PRIME_BITS} 以上にしてください。")
+    while True:
+        # 上位 2 ビットを立てて p × q が 2 × bits ビットになるようにする
+        start = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+        for offset in _sieve_window(start):
+            c = start + offset
+            if c.bit_length() != bits:
+                break
+            if gcd(e, c - 1) == 1 and _passes_miller_rabin(c):
+                return c
+
+
+def key_from_primes(p: int, q: int, e: int = DEFAULT_E) -> RSAKey:
+    """素数 p, q と公開指数 e から鍵一式を作る。"""
+    phi = (p - 1) * (q - 1)
+    if p == q or gcd(e, phi) != 1:
+        raise ValueError("p, q, e の組み合わせが不正です。")
+    d = pow(e, -1, phi)
+    return RSAKey(p * q, e, d, p, q, d % (p - 1), d % (q - 1), pow(q, -1, p))
+
+
+def _check_key_bits(bits: int):
+    if bits < MIN_KEY_BITS:
+        raise ValueError(f"bits は {MIN_KEY_BITS} 以上にしてください。")
+
+
+@timed("generate_keypair")
+def generate_keypair(bits: int = 2048, e: int = DEFAULT_E) -> RSAKey:
+    """n がちょうど bits ビットになる RSA 鍵を生成する。"""
+    _check_key_bits(bits)
+    half = bits // 2
+    while True:
+        p = random_prime(bits - half, e)
+        q = random_prime(half, e)
+        if p != q and (p * q).bit_length() == bits:
+            return key_from_primes(p, q, e)
+
+
+def _first_prime(candidates, e: int):
+    # ワーカープロセスで実行: 候補のうち最初に見つかった素数（なければ None）
+    for c in candidates:
+        if gcd(e, c - 1) == 1 and _passes_miller_rabin(c):
+            return c
+    return None
+
+
+def _candidate_chunks(bits: int):
+    # 篩を通過した bits ビットの候補を _CHUNK 個ずつ無限に返す
+    while True:
+        start = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+        chunk = []
+        for offset in _sieve_window(start):
+            c = start + offset
+            if c.bit_length() != bits:
+                break
+            chunk.append(c)
+            if len(chunk) == _CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+@timed("generate_keypair_parallel")
+def generate_keypair_parallel(bits: int = 3072, e: int = DEFAULT_E,
+                              executor: ProcessPoolExecutor = None,
+                              workers: int = None) -> RSAKey:
+    """generate_keypair の並列版。候補の判定をプロセスプールに分散する。
+
+    p と q が見つかった時点で未着手のタスクを取り消す。executor を渡さない
+    場合は workers 個（既定は CPU コア数）のプールをこの呼び出しの間だけ作る。
+    """
+    _check_key_bits(bits)
+    workers = workers or os.cpu_count() or 1
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return _keypair_parallel(bits, e, pool, workers)
+    return _keypair_parallel(bits, e, executor, workers)
+
+
+def _keypair_parallel(bits: int, e: int, executor: ProcessPoolExecutor, workers: int) -> RSAKey:
+    # generate_keypair_parallel の本体（@timed を付けず、計測は呼び出し元の 1 回だけ）
+    half = bits // 2
+    while True:
+        found = []
+        for size in (bits - half, half):
+            chunks = _candidate_chunks(size)
+            pending = {executor.submit(_first_prime, next(chunks), e) for _ in range(2 * workers)}
+            prime = None
+            try:
+                while prime is None:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        c = fut.result()
+                        if c is not None and c not in found and prime is None:
+                            prime = c
+                        elif prime is None:
+                            pending.add(executor.submit(_first_prime, next(chunks), e))
+            finally:
+                for fut in pending:
+                    fut.cancel()
+            found.append(prime)
+        p, q = found
+        # 上位 2 ビットを立てているので、n のビット数が足りずにやり直すことは通常ない
+        if (p * q).bit_length() == bits:
+            return key_from_primes(p, q, e)
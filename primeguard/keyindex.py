@@ -0,0 +1,164 @@
+"""教材用の鍵（p, q: 5000〜6000 の素数、e: 5001〜5999）の事前計算索引。
+
+すべての (p, q, e) の組について d をあらかじめ計算してファイルに保存し、
+mmap で開いて引くだけにする。n から (p, q) を引く逆引きもできる。
+
+    python -m primeguard build-index            # 既定の場所に作る
+    python -m primeguard build-index -o keys.idx
+
+ファイルの中身（すべてリトルエンディアン）:
+    ヘッダ      magic, version, lo, hi, e_lo, e_hi, 素数の個数
+    素数表      uint32 × 素数の個数
+    n の表      (n, i << 16 | j) の uint32 組 × 組の数（n の昇順）
+    d の表      uint32 × (e_hi - e_lo) × 組の数（使えない e は 0）
+組は p < q のものだけを持ち、(q, p) は (p, q) と同じ行を使う。
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from . import evalid
+from .numtheory import mod_inverse_batch
+from .primes import primes_in_range
+
+MAGIC = b"PGKI"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIIIII")
+_U32 = struct.Struct("<I")
+_PAIR = struct.Struct("<II")
+
+DEFAULT_PATH = os.environ.get("PRIMEGUARD_KEYINDEX") or os.path.join(
+    os.path.expanduser("~"), ".cache", "primeguard", "keyindex.bin")
+
+
+def _pair_pos(i: int, j: int, count: int) -> int:
+    # i < j の組を上三角の行優先で並べたときの位置
+    return i * count - i * (i + 1) // 2 + (j - i - 1)
+
+
+def _u32(values) -> bytes:
+    a = array("I", values)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a.tobytes()
+
+
+def build_index(path: str = DEFAULT_PATH, lo: int = 5000, hi: int = 6000,
+                e_lo: int = evalid.E_LO, e_hi: int = evalid.E_HI) -> str:
+    """索引ファイルを作って path を返す。書き込みは一時ファイル経由で行う。"""
+    primes = list(primes_in_range(lo, hi))
+    count, width = len(primes), e_hi - e_lo
+    pairs = [(i, j) for i in range(count) for j in range(i + 1, count)]
+    by_n = sorted((primes[i] * primes[j], i << 16 | j) for i, j in pairs)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, lo, hi, e_lo, e_hi, count))
+        f.write(_u32(primes))
+        f.write(_u32(v for row in by_n for v in row))
+        for i, j in pairs:
+            p, q = primes[i], primes[j]
+            phi = (p - 1) * (q - 1)
+            es = [e for e in evalid.e_candidates(phi, p, q) if e_lo <= e < e_hi]
+            row = [0] * width
+            for e, d in zip(es, mod_inverse_batch(es, phi)):
+                row[e - e_lo] = d
+            f.write(_u32(row))
+    os.replace(tmp, path)
+    return path
+
+
+class KeyIndex:
+    """build_index で作ったファイルを mmap で開いたもの。"""
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise ValueError(f"鍵の索引ファイルではありません: {path}")
+        magic, version, self.lo, self.hi, self.e_lo, self.e_hi, count = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"鍵の索引ファイルではありません: {path}")
+        off = _HEADER.size
+        self._pairs = count * (count - 1) // 2
+        self._n_off = off + 4 * count
+        self._d_off = self._n_off + _PAIR.size * self._pairs
+        self._width = self.e_hi - self.e_lo
+        # 途中で切れたファイルなどは、読み始める前に大きさの食い違いで見つける
+        if self._width < 0 or len(self._mm) != self._d_off + 4 * self._width * self._pairs:
+            self._mm.close()
+            raise ValueError(f"鍵の索引ファイルが壊れています（作り直してください）: {path}")
+        self.primes = struct.unpack_from(f"<{count}I", self._mm, off)
+        self._pos = {p: i for i, p in enumerate(self.primes)}
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _row_offset(self, p: int, q: int):
+        i, j = self._pos.get(p), self._pos.get(q)
+        if i is None or j is None or i == j:
+            return None
+        if i > j:
+            i, j = j, i
+        return self._d_off + 4 * self._width * _pair_pos(i, j, len(self.primes))
+
+    def covers(self, p: int, q: int, e: int) -> bool:
+        """(p, q, e) がこの索引の範囲に入っているか。"""
+        return p in self._pos and q in self._pos and self.e_lo <= e < self.e_hi
+
+    def lookup(self, p: int, q: int, e: int):
+        """(p, q, e) の秘密鍵 d。p == q や e が使えないときは None。"""
+        off = self._row_offset(p, q)
+        if off is None or not self.e_lo <= e < self.e_hi:
+            return None
+        d = _U32.unpack_from(self._mm, off + 4 * (e - self.e_lo))[0]
+        return d or None
+
+    def table(self, p: int, q: int):
+        """(p, q) で選べるすべての e と d の対応表 {"e": [...], "d": [...]}。"""
+        off = self._row_offset(p, q)
+        if off is None:
+            return {"e": [], "d": []}
+        row = struct.unpack_from(f"<{self._width}I", self._mm, off)
+        es = [self.e_lo + k for k, d in enumerate(row) if d]
+        return {"e": es, "d": [row[e - self.e_lo] for e in es]}
+
+    def factor(self, n: int):
+        """n = p × q となる索引内の素数の組 (p, q)（p < q）。なければ None。"""
+        lo, hi = 0, self._pairs
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _PAIR.unpack_from(self._mm, self._n_off + _PAIR.size * mid)[0] < n:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self._pairs:
+            return None
+        value, ij = _PAIR.unpack_from(self._mm, self._n_off + _PAIR.size * lo)
+        if value != n:
+            return None
+        return self.primes[ij >> 16], self.primes[ij & 0xFFFF]
+
+
+def open_index(path: str = DEFAULT_PATH, build: bool = False):
+    """索引を開く。ファイルがなければ build=True のとき作り、そうでなければ None。
+
+    作るには 1〜2 秒かかるので、アプリからは build=False で開き、ファイルは
+    python -m primeguard build-index で前もって作っておく。
+    """
+    if not os.path.exists(path):
+        if not build:
+            return None
+        build_index(path)
+    return KeyIndex(path)
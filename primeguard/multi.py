@@ -0,0 +1,70 @@
+"""同じ平文を複数の受信者の公開鍵でまとめて暗号化する。
+
+平文の検査と数値への変換は最初に 1 回だけ行い、各鍵でのべき乗剰余だけを
+プロセスプールに分散する。結果は鍵の指紋 → Base64 暗号文の辞書。
+
+    ciphers = encrypt_for_recipients("HELLO", [(n1, e1), (n2, e2), ...])
+    ciphers[key_fingerprint(n1, e1)]
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .codec import EncryptionContext, check_plaintext, pack_width, plain_values
+from .instrument import timed
+
+# 1 タスクで処理する鍵の数（プロセス間通信の回数を減らす）
+KEYS_PER_TASK = 64
+# これより鍵が少なければプールを使わずにこのプロセスで計算する
+PARALLEL_MIN_KEYS = 256
+
+
+def key_fingerprint(n: int, e: int) -> str:
+    """公開鍵 (n, e) の指紋（SHA-256 の先頭 16 桁の 16 進数）。"""
+    data = b"%d:%d" % (n, e)
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _encrypt_task(args):
+    # ワーカープロセスで実行: 同じ平文の値を keys のそれぞれで暗号化する
+    values, pack, keys = args
+    return [EncryptionContext(n, e).encrypt_values(values, pack) for n, e in keys]
+
+
+@timed("encrypt_for_recipients")
+def encrypt_for_recipients(plaintext: str, keys, pack: bool = False,
+                           executor: ProcessPoolExecutor = None, workers: int = None):
+    """plaintext を keys の各公開鍵 (n, e) で暗号化し、{指紋: Base64 暗号文} を返す。
+
+    暗号文は encrypt_blocks(plaintext, n, e, pack) と同じ。executor を渡すと
+    そのプールで計算する。渡さない場合は、鍵が PARALLEL_MIN_KEYS 個以上なら
+    workers 個（既定は CPU コア数）のプールをこの呼び出しの間だけ作り、
+    それより少ないか workers=1 ならこのプロセスで計算する。
+    平文に ALPHABET 以外の文字があれば ValueError。
+    """
+    check_plaintext(plaintext)
+    keys = [(int(n), int(e)) for n, e in keys]
+    # pack のときは 1 ブロックの文字数が同じ鍵どうしで平文の値を共有する
+    groups = {}
+    for n, e in keys:
+        groups.setdefault(pack_width(n) if pack else 0, []).append((n, e))
+    tasks = []
+    for width, group in groups.items():
+        values = plain_values(plaintext, width)
+        tasks += [(values, pack, group[i:i + KEYS_PER_TASK]) for i in range(0, len(group), KEYS_PER_TASK)]
+
+    if executor is None and (len(keys) < PARALLEL_MIN_KEYS or workers == 1):
+        return _collect(tasks, map(_encrypt_task, tasks))
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            return _collect(tasks, pool.map(_encrypt_task, tasks))
+    return _collect(tasks, executor.map(_encrypt_task, tasks))
+
+
+def _collect(tasks, results):
+    # タスクごとの結果を {指紋: Base64 暗号文} にまとめる
+    out = {}
+    for (_, _, group), ciphers in zip(tasks, results):
+        for (n, e), b64 in zip(group, ciphers):
+            out[key_fingerprint(n, e)] = b64
+    return out
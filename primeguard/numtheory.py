@@ -0,0 +1,123 @@
+"""最大公約数・逆元・CRT・べき乗剰余などの整数論の基本関数。"""
+from functools import lru_cache
+
+from .instrument import timed
+
+
+def gcd(a: int, b: int) -> int:
+    while b:
+        a, b = b, a % b
+    return a
+
+
+@timed("mod_inverse")
+def mod_inverse(a: int, m: int):
+    # 拡張ユークリッド互除法（再帰を使わない反復版）
+    r0, r1 = a % m, m
+    x0, x1 = 1, 0
+    while r1:
+        k = r0 // r1
+        r0, r1 = r1, r0 - k * r1
+        x0, x1 = x1, x0 - k * x1
+    return x0 % m if r0 == 1 else None
+
+
+@timed("mod_inverse_batch")
+def mod_inverse_batch(values, m: int):
+    """values の各要素の逆元 (mod m) のリスト。逆元がない要素は None。
+
+    Montgomery の一括逆元: 累積積の逆元を 1 回だけ求め、掛け算で各要素に戻す。
+    """
+    values = list(values)
+    prefix = []
+    acc = 1
+    for v in values:
+        prefix.append(acc)
+        acc = acc * v % m
+    inv = mod_inverse(acc, m)
+    if inv is None:
+        # 逆元を持たない要素が混ざっているときは 1 つずつ求める
+        return [mod_inverse(v, m) for v in values]
+    result = [None] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        result[i] = inv * prefix[i] % m
+        inv = inv * values[i] % m
+    return result
+
+
+def crt_pow(c: int, p: int, q: int, dp: int, dq: int, qinv: int, modpow=pow) -> int:
+    """c^d mod pq を中国剰余定理（Garner の復元）で計算する。
+
+    modpow には pow の代わりに ladder_pow などを渡せる。
+    """
+    m1 = modpow(c, dp, p)
+    m2 = modpow(c, dq, q)
+    return m2 + (qinv * (m1 - m2) % p) * q
+
+
+class Montgomery:
+    """奇数の法 n の Montgomery 表現と、Montgomery ladder によるべき乗剰余。
+
+    R = 2^(n のビット数 + 2) とすると 4n < R なので、積の還元結果は
+    常に 2n 未満に収まり、途中で「n 以上なら n を引く」分岐がいらない。
+    """
+
+    __slots__ = ("n", "shift", "mask", "n_prime", "r2", "one")
+
+    def __init__(self, n: int):
+        if n < 1 or n % 2 == 0:
+            raise ValueError("Montgomery 表現の法は正の奇数でなければなりません。")
+        self.n = n
+        self.shift = n.bit_length() + 2
+        self.mask = (1 << self.shift) - 1
+        self.n_prime = -mod_inverse(n, 1 << self.shift) & self.mask  # -n^-1 mod R
+        self.r2 = pow(1 << self.shift, 2, n)
+        self.one = (1 << self.shift) % n
+
+    def reduce(self, t: int) -> int:
+        """t < nR に対して t R^-1 mod n（2n 未満、n 以上のこともある）。"""
+        return (t + ((t & self.mask) * self.n_prime & self.mask) * self.n) >> self.shift
+
+    def to_mont(self, a: int) -> int:
+        return self.reduce(a % self.n * self.r2)
+
+    def from_mont(self, a: int) -> int:
+        t = self.reduce(a)
+        return t - (self.n & -(t >= self.n))  # t >= n のときだけ n を引く（分岐なし）
+
+    def pow(self, base: int, exp: int) -> int:
+        """base^exp mod n。exp のビットによらず、各ビットで同じ演算（積 1 回・
+        2 乗 1 回・入れ替え 1 回）を n のビット数ぶん行う。"""
+        if exp < 0:
+            raise ValueError("指数は 0 以上でなければなりません。")
+        n, shift, mask, n_prime = self.n, self.shift, self.mask, self.n_prime
+        bits = bin(exp)[2:].zfill(n.bit_length())
+        x0, x1 = self.one, self.to_mont(base)  # 常に x1 = x0 * base
+        prev = False
+        for ch in bits:
+            bit = ch == "1"
+            # ビットが 1 のときは x0 と x1 を入れ替えて同じ式で計算し、元に戻す。
+            # 戻す入れ替えは次のビットの入れ替えとまとめる（bit ^ prev）
+            t = -(bit ^ prev) & (x0 ^ x1)
+            x0 ^= t
+            x1 ^= t
+            prev = bit
+            t = x0 * x1
+            x1 = (t + ((t & mask) * n_prime & mask) * n) >> shift
+            t = x0 * x0
+            x0 = (t + ((t & mask) * n_prime & mask) * n) >> shift
+        t = -prev & (x0 ^ x1)
+        x0 ^= t
+        return self.from_mont(x0)
+
+
+@lru_cache(maxsize=16)
+def montgomery(n: int) -> Montgomery:
+    """法 n の Montgomery 表現（同じ n では使い回す）。"""
+    return Montgomery(n)
+
+
+def ladder_pow(base: int, exp: int, mod: int) -> int:
+    """pow(base, exp, mod) と同じ値を、指数のビットに時間が左右されにくい
+    Montgomery ladder で計算する（mod は奇数）。"""
+    return montgomery(mod).pow(base, exp)
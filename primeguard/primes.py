@@ -0,0 +1,52 @@
+"""素数の列挙（エラトステネスの篩と区間篩）。"""
+from math import isqrt
+
+from .instrument import timed
+
+
+@timed("primes_in_range")
+def primes_in_range(lo: int, hi: int, segment: int = 1 << 16):
+    """lo 以上 hi 以下の素数を小さい順に返すジェネレータ（区間篩）。
+
+    √hi までの素数だけを使い、奇数のみを 1 バイトで表す bytearray を
+    segment 個ずつ篩うので、10^9 付近の区間でもメモリは区間幅に比例する。
+    """
+    if hi < 2 or lo > hi:
+        return
+    if lo <= 2:
+        yield 2
+    lo = max(lo, 3) | 1  # 奇数から始める
+    base = generate_primes(isqrt(hi))[1:]  # 3 以上の基底素数
+    for seg_lo in range(lo, hi + 1, 2 * segment):
+        seg_hi = min(seg_lo + 2 * segment - 2, hi)
+        count = (seg_hi - seg_lo) // 2 + 1  # seg_lo, seg_lo+2, ... の個数
+        sieve = bytearray(b"\x01") * count
+        for p in base:
+            start = p * p
+            if start > seg_hi:
+                break
+            if start < seg_lo:
+                start = -(-seg_lo // p) * p
+                if start % 2 == 0:
+                    start += p
+            idx = (start - seg_lo) // 2
+            if idx < count:
+                sieve[idx::p] = bytes((count - 1 - idx) // p + 1)
+        i = sieve.find(1)
+        while i != -1:
+            yield seg_lo + 2 * i
+            i = sieve.find(1, i + 1)
+
+
+@timed("generate_primes")
+def generate_primes(n: int):
+    if n < 2:
+        return []
+    if n < 1 << 16:
+        sieve = bytearray(b"\x01") * (n + 1)
+        sieve[0:2] = b"\x00\x00"
+        for i in range(2, isqrt(n) + 1):
+            if sieve[i]:
+                sieve[i * i::i] = bytes((n - i * i) // i + 1)
+        return [i for i, ok in enumerate(sieve) if ok]
+    return list(primes_in_range(2, n))
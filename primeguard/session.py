@@ -0,0 +1,106 @@
+"""セッションごとの鍵と暗号文（Streamlit に依存しない）。
+
+n, e, d は整数、暗号文は Base64 を戻した bytes のまま 1 か所に持ち、
+しばらく操作のないセッションの分は消す。暗号文は MAX_CIPHERTEXT
+バイトまでしか持たない。memory() で全セッションの使用量（概算）を返す。
+
+    store = SessionStore()
+    store.set_key(sid, n, e, d, crt)
+    store.get(sid).n                 # 期限切れなら新しい空の記録
+    store.set_cipher(sid, b64)
+    store.cipher_b64(sid)
+"""
+import base64
+import sys
+import threading
+import time
+
+# 操作がないまま、これだけ経ったセッションの記録を消す（秒）
+IDLE_TTL = 30 * 60
+# 期限切れの確認はこの間隔でまとめて行う（秒）
+EXPIRE_INTERVAL = 60
+# 1 セッションで持つ暗号文の最大バイト数（Base64 で 64K 文字）
+MAX_CIPHERTEXT = 48 * 1024
+
+
+def deep_sizeof(obj) -> int:
+    """obj と、その中の tuple / list / dict / set の要素の sys.getsizeof の合計。"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(deep_sizeof(v) for v in obj)
+    return size
+
+
+class SessionRecord:
+    """1 セッション分の鍵と暗号文。"""
+
+    __slots__ = ("n", "e", "d", "crt", "cipher", "state_bytes", "touched")
+
+    def __init__(self):
+        self.n = self.e = self.d = self.crt = None
+        self.cipher = b""
+        self.state_bytes = 0  # 呼び出し側が報告した、それ以外の状態（ウィジェットの値など）
+        self.touched = time.monotonic()
+
+    def nbytes(self) -> int:
+        """この記録が使っているメモリの概算（バイト）。"""
+        own = sys.getsizeof(self) + sum(deep_sizeof(getattr(self, k)) for k in ("n", "e", "d", "crt", "cipher"))
+        return own + self.state_bytes
+
+
+class SessionStore:
+    """セッション ID → SessionRecord。スレッドセーフ。"""
+
+    def __init__(self, ttl: float = IDLE_TTL, max_ciphertext: int = MAX_CIPHERTEXT):
+        self.ttl = ttl
+        self.max_ciphertext = max_ciphertext
+        self._records = {}
+        self._lock = threading.Lock()
+        self._expired_at = time.monotonic()
+
+    def _expire(self, now: float):
+        if now - self._expired_at < EXPIRE_INTERVAL:
+            return
+        self._expired_at = now
+        for sid in [k for k, r in self._records.items() if now - r.touched > self.ttl]:
+            del self._records[sid]
+
+    def get(self, sid: str) -> SessionRecord:
+        """sid の記録（なければ、または期限切れで消えていれば空の記録を作る）。"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            record = self._records.get(sid)
+            if record is None or now - record.touched > self.ttl:
+                record = self._records[sid] = SessionRecord()
+            record.touched = now
+            return record
+
+    def set_key(self, sid: str, n: int, e: int, d: int, crt=None):
+        record = self.get(sid)
+        record.n, record.e, record.d = int(n), int(e), int(d)
+        record.crt = None if crt is None else tuple(int(v) for v in crt)
+
+    def set_cipher(self, sid: str, b64: str):
+        """Base64 の暗号文を bytes にして持つ。大きすぎれば持たずに ValueError。"""
+        data = base64.b64decode(b64, validate=True)
+        record = self.get(sid)
+        if len(data) > self.max_ciphertext:
+            record.cipher = b""
+            raise ValueError(f"暗号文が大きすぎるため保持しません（最大 {self.max_ciphertext // 1024} KB）。")
+        record.cipher = data
+
+    def cipher_b64(self, sid: str) -> str:
+        return base64.b64encode(self.get(sid).cipher).decode()
+
+    def report_state(self, sid: str, nbytes: int):
+        """記録以外にこのセッションが持っている状態の大きさを伝える（memory() に含める）。"""
+        self.get(sid).state_bytes = nbytes
+
+    def memory(self):
+        """{"sessions": 記録の数, "bytes": 合計, "max": 最大のセッション}（バイト）。"""
+        with self._lock:
+            sizes = [r.nbytes() for r in self._records.values()]
+        return {"sessions": len(sizes), "bytes": sum(sizes), "max": max(sizes, default=0)}
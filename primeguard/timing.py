@@ -0,0 +1,81 @@
+"""復号時間と秘密鍵 d のビットパターンの関係を測る（タイミング攻撃の実演用）。
+
+d と同じビット数で 1 のビットの割合が違う指数を作り、同じ暗号文を
+pow と ladder_pow で何度も復号して、1 回ごとの時間（ナノ秒）を集める。
+pow は 1 のビットが多いほど遅くなり、ladder_pow はほとんど変わらない。
+
+    timings = decryption_timings(key.n, weight_exponents(key.d), samples=2000)
+    leak_t(timings["pow"]), leak_t(timings["ladder"])
+"""
+import math
+import random
+import statistics
+import time
+
+from .instrument import timed
+from .numtheory import ladder_pow
+
+ENGINES = {"pow": pow, "ladder": ladder_pow}
+# 作る指数の名前 → 1 のビットの割合
+WEIGHTS = {"1 が 1/8": 0.125, "1 が 1/2": 0.5, "1 が 7/8": 0.875}
+# Welch の |t| がこれを超えれば、時間の分布に差がある（漏れている）とみなす
+LEAK_T = 4.5
+# t 値を求める前に除く遅い側の外れ値（割り込みなどで長くなった回）の割合
+TRIM = 0.05
+
+
+def weighted_exponent(bits: int, weight: float, rng) -> int:
+    """最上位ビットが 1 で、残りの各ビットが確率 weight で 1 になる bits ビットの整数。"""
+    e = 1
+    for _ in range(bits - 1):
+        e = e << 1 | (rng.random() < weight)
+    return e
+
+
+def weight_exponents(d: int, rng=None):
+    """{名前: 指数}。WEIGHTS の割合で作った d と同じビット数の指数と、d 自身。"""
+    rng = rng or random.Random()
+    exponents = {label: weighted_exponent(d.bit_length(), w, rng) for label, w in WEIGHTS.items()}
+    exponents["実際の d"] = d
+    return exponents
+
+
+@timed("decryption_timings")
+def decryption_timings(n: int, exponents, samples: int = 1000, engines=ENGINES, seed=None):
+    """{エンジン名: {指数の名前: [1 回の時間 (ns), ...]}}。
+
+    暗号文は毎回ランダムに選んで、すべての指数・エンジンで復号する。
+    時間の揺らぎ（他の処理や周波数の変化）が特定の組に偏らないよう、
+    組の順番も毎回混ぜる。
+    """
+    rng = random.Random(seed)
+    jobs = [(name, label, fn, exp) for name, fn in engines.items() for label, exp in exponents.items()]
+    out = {name: {label: [] for label in exponents} for name in engines}
+    for _, _, fn, exp in jobs:
+        fn(2, exp, n)  # Montgomery 表現の準備などを計測に含めない
+    clock = time.perf_counter_ns
+    for _ in range(samples):
+        c = rng.randrange(2, n - 1)
+        rng.shuffle(jobs)
+        for name, label, fn, exp in jobs:
+            start = clock()
+            fn(c, exp, n)
+            out[name][label].append(clock() - start)
+    return out
+
+
+def welch_t(a, b) -> float:
+    """2 つの標本の平均の差についての Welch の t 値。"""
+    se = math.sqrt(statistics.variance(a) / len(a) + statistics.variance(b) / len(b))
+    return (statistics.fmean(a) - statistics.fmean(b)) / se if se else 0.0
+
+
+def _trim(values):
+    values = sorted(values)
+    return values[:max(2, int(len(values) * (1 - TRIM)))]
+
+
+def leak_t(by_label) -> float:
+    """1 のビットが最も少ない指数と最も多い指数の時間の |t|（LEAK_T 超なら漏れている）。"""
+    low, *_, high = WEIGHTS
+    return abs(welch_t(_trim(by_label[low]), _trim(by_label[high])))
@@ -1,87 +1,774 @@
+import os
 import re
-import base64
+import html
+import json
 import binascii
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import streamlit as st
 import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from primeguard import evalid, instrument, timing
+from primeguard import factor as factoring
+from primeguard.codec import decrypt_blocks, decrypt_stream, encrypt_blocks, encrypt_stream
+from primeguard.exchange import ExchangeService
+from primeguard.hybrid import HYBRID_MIN_BITS, hybrid_decrypt, hybrid_encrypt
+from primeguard.keygen import KEY_SIZES, DEFAULT_E, generate_keypair, generate_keypair_parallel, is_probable_prime
+from primeguard.keyindex import open_index
+from primeguard.multi import PARALLEL_MIN_KEYS, encrypt_for_recipients, key_fingerprint
+from primeguard.numtheory import gcd, mod_inverse, mod_inverse_batch
+from primeguard.primes import primes_in_range
+from primeguard.session import MAX_CIPHERTEXT, SessionStore, deep_sizeof
+
+_run_start = time.perf_counter()
 
 # --- ページ設定 ---
 st.set_page_config(page_title="PrimeGuard RSA")
 
 # --- 文字集合（A-Z と 0-9 をサポート）---
-ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-CHAR_TO_VAL = {ch: i for i, ch in enumerate(ALPHABET)}
-VAL_TO_CHAR = list(ALPHABET)
 ALPHABET_DESC = "A–Z と 0–9 のみ（最大5文字）"
 
+# --- 暗号化の方式 ---
+BLOCK_MODES = ["1文字ずつ", "まとめて（複数文字を1ブロックに）", "ハイブリッド（RSA-OAEP + 共通鍵）"]
+
+# --- 鍵の種類 ---
+KEY_KINDS = ["教材用（5000〜6000 の素数）", "大きな鍵（ビット数を指定）"]
+LARGE_KEY_DESC = (
+    "p, q は n の半分のビット数の素数を、試し割りと Miller–Rabin 法で探します。"
+    f"公開鍵 e は {DEFAULT_E} を使います。"
+)
+
+# --- 暗号文の入力欄の最大文字数（保持する暗号文の上限を Base64 にした長さ）---
+MAX_CIPHER_CHARS = MAX_CIPHERTEXT // 3 * 4
+
+# --- ファイルをまとめて暗号化・復号するときのアップロードの上限（MB）---
+# 結果はダウンロードのときに Streamlit がメモリに 1 回読み込むので、その大きさを抑える
+FILE_MAX_MB = 10
+# 結果をメモリに置く上限（これを超えた分は一時ファイルに書く）
+SPOOL_MEMORY = 1 << 20
+
+# --- 素因数分解の方法（鍵を破るモード）---
+FACTOR_METHODS = {
+    "trial": "試し割り",
+    "rho": "Pollard の rho 法",
+    "fermat": "Fermat 法",
+}
+# これより大きい n は時間がかかりすぎるので分解しない
+# （スクリプトのスレッドで計算するので、その間画面が止まる。rho は 80 ビットで 1 秒弱）
+FACTOR_MAX_BITS = {"trial": 50, "rho": 80, "fermat": 4096}
+
 # --- ヘルパー関数 ---
-def generate_primes(n: int):
-    sieve = [True] * (n + 1)
-    sieve[0:2] = [False, False]
-    for i in range(2, int(n**0.5) + 1):
-        if sieve[i]:
-            for j in range(i * i, n + 1, i):
-                sieve[j] = False
-    return [i for i, ok in enumerate(sieve) if ok]
-
-def gcd(a: int, b: int) -> int:
-    while b:
-        a, b = b, a % b
-    return a
-
-def mod_inverse(a: int, m: int):
-    # 拡張ユークリッド互除法
-    def egcd(x, y):
-        if y == 0:
-            return (1, 0, x)
-        u, v, g = egcd(y, x % y)
-        return (v, u - (x // y) * v, g)
-    x, _, g = egcd(a, m)
-    return x % m if g == 1 else None
+E_LO, E_HI = evalid.E_LO, evalid.E_HI
 
+@st.cache_data(max_entries=256, show_spinner=False)
 def e_candidates(phi: int, p: int, q: int):
-    # 教材用：5001〜5999 から φ(n) と互いに素、かつ p,q と異なる値
-    return [i for i in range(5001, 6000) if gcd(i, phi) == 1 and i not in (p, q)]
-
-def encrypt_blocks(plaintext: str, n: int, e: int) -> str:
-    """ALPHABET 上の文字を1文字ずつ RSA で暗号化し、Base64 文字列で返す。"""
-    size = (n.bit_length() + 7) // 8
-    cb = b''.join(
-        pow(CHAR_TO_VAL[c], e, n).to_bytes(size, 'big')
-        for c in plaintext
+    """evalid.e_candidates を全セッション共通でキャッシュしたもの。"""
+    return evalid.e_candidates(phi, p, q)
+
+@st.cache_resource(show_spinner=False)
+def e_valid_matrix(primes: tuple):
+    """evalid.e_valid_matrix を全セッションで共有する（コピーしない）。"""
+    return evalid.e_valid_matrix(primes)
+
+def e_validator(name: str):
+    """このセッションの e の判定表（p, q が変わったときだけ作り直す）。"""
+    k = f"{name}_evalid"
+    if k not in st.session_state:
+        st.session_state[k] = evalid.EValidator()
+    return st.session_state[k]
+
+def use_e(key: str, e: int):
+    # 提案された e を入力欄に入れる（ボタンのコールバック）
+    st.session_state[key] = e
+
+def e_status(name: str, p: int, q: int, e: int) -> bool:
+    """e の妥当性と φ(n) を表示し、使えない e なら最も近い使える e を提案する。"""
+    v = e_validator(name)
+    v.update(p, q)
+    valid_now = v.is_valid(e)
+    st.caption(f"現在の e の妥当性: {'OK' if valid_now else 'NG'} / φ(n)={v.phi}")
+    if not valid_now:
+        near = v.nearest(e)
+        if near is not None:
+            st.button(f"近くの使える e = {near} にする", key=f"{name}_e_fix", on_click=use_e, args=(f"{name}_e", near))
+    return valid_now
+
+def encrypt_with_mode(plaintext: str, n: int, e: int, mode: str) -> str:
+    """BLOCK_MODES で選んだ方式で暗号化する。"""
+    if mode == BLOCK_MODES[2]:
+        return hybrid_encrypt(plaintext, n, e)
+    return encrypt_blocks(plaintext, n, e, pack=mode == BLOCK_MODES[1])
+
+def decrypt_with_mode(b64: str, n: int, d: int, crt, mode: str) -> str:
+    """BLOCK_MODES で選んだ方式で復号する。"""
+    if mode == BLOCK_MODES[2]:
+        return hybrid_decrypt(b64, n, d, crt)
+    return decrypt_blocks(b64, n, d, crt, pack=mode == BLOCK_MODES[1])
+
+@st.cache_resource(show_spinner=False)
+def key_index():
+    """教材用の鍵の索引（mmap で全セッション共有）。
+
+    索引は python -m primeguard build-index で前もって作っておく（画面の表示中には
+    作らない）。ファイルがない・壊れているときは None で、d はその場で計算する。
+    """
+    try:
+        return open_index()
+    except (OSError, ValueError):
+        return None
+
+def classroom_d(p: int, q: int, e: int):
+    """教材用の鍵の秘密鍵 d。索引があれば引くだけ、なければ計算する。"""
+    index = key_index()
+    if index is not None and index.covers(p, q, e):
+        return index.lookup(p, q, e)
+    phi = (p - 1) * (q - 1)
+    return mod_inverse(e, phi) if gcd(e, phi) == 1 and e not in (p, q) else None
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def key_table(p: int, q: int):
+    """(p, q) で選べるすべての e と、それぞれの秘密鍵 d の対応表。"""
+    index = key_index()
+    if index is not None and p in index.primes and q in index.primes:
+        return index.table(p, q)
+    phi = (p - 1) * (q - 1)
+    es = e_candidates(phi, p, q)
+    return {"e": es, "d": mod_inverse_batch(es, phi)}
+
+@st.cache_resource(show_spinner=False)
+def sessions():
+    """全セッションの鍵と暗号文（整数・bytes で持ち、操作のないセッションの分は消す）。"""
+    return SessionStore()
+
+def session_id():
+    return get_script_run_ctx().session_id
+
+def my_key():
+    """このセッションの記録（n, e, d, crt, cipher）。"""
+    return sessions().get(session_id())
+
+def crt_for(n: int, d: int):
+    """入力された (n, d) がこのセッションで生成した鍵なら CRT 用の値を返す。"""
+    key = my_key()
+    if (n, d) == (key.n, key.d):
+        return key.crt
+    return None
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def primes_between(lo: int, hi: int):
+    """lo 以上 hi 以下の素数リスト。全セッション共通でキャッシュし、再実行では篩い直さない。"""
+    return list(primes_in_range(lo, hi))
+
+@st.cache_data(max_entries=8, show_spinner="分解にかかる時間を測っています…")
+def factoring_scaling(max_bits: int):
+    """ビット数ごとの分解時間の表（全セッション共通でキャッシュ）。"""
+    bits_list = list(range(20, max_bits + 1, 4))
+    curve = factoring.scaling(bits_list, methods=tuple(FACTOR_METHODS), budget=0.5)
+    table = {"ビット数": bits_list}
+    for method, label in FACTOR_METHODS.items():
+        times = dict(curve[method])
+        table[label] = [round(times[b] * 1e3, 3) if b in times else None for b in bits_list]
+    return table
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def timing_key(bits: int):
+    """タイミング解析に使う鍵（ビット数ごとに 1 つ、全セッション共通）。"""
+    return generate_keypair(bits)
+
+def timing_histogram(by_label, bins: int = 40):
+    """{名前: 時間 (ns) のリスト} を共通の区間で数えた表（遅い側 1% の外れ値は除く）。"""
+    us = {label: np.asarray(v) / 1e3 for label, v in by_label.items()}
+    lo, hi = np.percentile(np.concatenate(list(us.values())), [0.5, 99])
+    edges = np.linspace(lo, hi, bins + 1)
+    table = {"時間 (µs)": np.round((edges[:-1] + edges[1:]) / 2, 1)}
+    for label, v in us.items():
+        table[label] = np.histogram(v, edges)[0]
+    return table
+
+@st.cache_resource(show_spinner=False)
+def exchange():
+    """公開鍵と暗号文の掲示板（全セッションで共有。専用スレッドの asyncio で動く）。"""
+    return ExchangeService()
+
+def use_message(ciphertext: str, mode: str):
+    # 受信箱の暗号文を復号欄に入れる（ボタンのコールバック）
+    st.session_state["dec_c"] = ciphertext
+    if mode in BLOCK_MODES:
+        st.session_state["dec_mode"] = mode
+    st.session_state["inbox_rerun"] = True
+
+def fill_from_board():
+    # 掲示板で選んだ公開鍵を暗号化欄に入れる（選択のコールバック）
+    key = next((k for k in exchange().keys() if k["id"] == st.session_state.get("enc_box")), None)
+    if key is not None:
+        st.session_state["enc_n"] = str(key["n"])
+        st.session_state["enc_e"] = str(key["e"])
+
+@st.fragment(run_every=3)
+def inbox(box_id: str):
+    """受信箱の暗号文一覧。3 秒ごとにこの部分だけ再実行して新着を取りに行く。"""
+    if st.session_state.pop("inbox_rerun", False):
+        st.rerun()  # 復号欄を更新するためページ全体を再実行する
+    try:
+        messages = exchange().fetch(box_id)
+    except KeyError:
+        st.warning("受信箱の期限が切れました。もう一度公開してください。")
+        return
+    if not messages:
+        st.caption("まだ暗号文は届いていません。")
+    for m in reversed(messages):
+        col, btn = st.columns([4, 1])
+        col.markdown(f"**{m['sender']}** から（{m['mode'] or '方式不明'}）")
+        col.code(m["ciphertext"])
+        btn.button("復号欄へ", key=f"inbox_use_{m['seq']}", on_click=use_message, args=(m["ciphertext"], m["mode"]))
+
+@st.cache_resource(show_spinner=False)
+def keygen_pool():
+    """並列鍵生成・一斉暗号化用のプロセスプール（全セッションで共有）。"""
+    return ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+
+def copy_buttons(items):
+    """(ラベル, 値) を表示し、コピーボタンは 1 つの iframe にまとめて描画する。"""
+    for label, val in items:
+        st.write(f"{label}: {val}")
+    buttons = "".join(
+        f'<button style="border:none;background:none;padding:0 1em 0 0;color:blue;cursor:pointer;" '
+        f'onclick="navigator.clipboard.writeText({html.escape(json.dumps(str(val)))})">{html.escape(label)} をコピー</button>'
+        for label, val in items
     )
-    return base64.b64encode(cb).decode()
-
-def decrypt_blocks(b64: str, n: int, d: int) -> str:
-    """Base64 暗号文を復号し、ALPHABET の文字列に戻す。"""
-    cb = base64.b64decode(b64)
-    size = (n.bit_length() + 7) // 8
-    if size == 0 or len(cb) % size != 0:
-        raise ValueError("ブロック長が一致しません（鍵 n が違う可能性）。")
-    chars = []
-    for i in range(0, len(cb), size):
-        block = cb[i:i + size]
-        m = pow(int.from_bytes(block, 'big'), d, n)
-        if not (0 <= m < len(ALPHABET)):
-            raise ValueError("復号値が想定範囲外です（鍵の組み合わせを確認）。")
-        chars.append(VAL_TO_CHAR[m])
-    return ''.join(chars)
+    components.html(buttons, height=30)
+
+def store_key(done: str, n: int, e: int, d: int, crt, message: str):
+    """生成した鍵を保存し、鍵の表示と下の欄を更新するためページ全体を再実行する。"""
+    sessions().set_key(session_id(), n, e, d, crt)
+    # 復号欄は入力値を消して、新しい鍵（整数）から初期値を作り直させる
+    st.session_state.pop("dec_n", None)
+    st.session_state.pop("dec_d", None)
+    st.session_state[done] = True
+    st.session_state["keygen_msg"] = message
+    st.rerun()
+
+# ========== 各セクション（st.fragment: 操作したセクションだけ再実行する） ==========
+
+@st.fragment
+def recv_keygen():
+    """受信者の鍵生成。"""
+    kind = st.radio("鍵の種類", KEY_KINDS, horizontal=True, key='recv_kind')
+    if kind == KEY_KINDS[0]:
+        st.caption("p, q は異なる素数を選び、φ(n) と互いに素な公開鍵 e を設定してください。e が勝手に変わらないよう、数値入力にしています。")
+
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            p = st.selectbox("素数 p", primes, key='recv_p')
+        with c2:
+            q = st.selectbox("素数 q", primes, key='recv_q')
+        with c3:
+            # e は number_input のデフォルト値 5001 をそのまま使う
+            e = st.number_input(
+                "公開鍵 e (5001–5999)",
+                min_value=5001,
+                max_value=5999,
+                step=1,
+                key='recv_e'
+            )
+
+        valid_now = e_status('recv', p, q, e)
+        if E_LO <= e < E_HI:
+            with st.expander(f"e = {e} が使える (p, q) の組み合わせ"):
+                grid = e_valid_matrix(tuple(primes))[:, :, e - E_LO]
+                rgb = np.where(grid[:, :, None], [46, 160, 67], [220, 220, 220]).astype(np.uint8)
+                st.image(rgb.repeat(3, axis=0).repeat(3, axis=1))
+                st.caption(f"縦軸 p・横軸 q（{primes[0]}〜{primes[-1]}）。緑が使える組み合わせで、{int(grid.sum())} 通りあります。")
+        if p != q:
+            with st.expander("この p, q で選べる e と秘密鍵 d の一覧"):
+                st.dataframe(key_table(p, q), hide_index=True, use_container_width=True)
+
+        if st.button("鍵生成", key='recv_gen'):
+            if p == q:
+                st.error("p と q は異なる素数を選んでください。")
+            elif not valid_now:
+                st.error("e は φ(n) と互いに素で、p と q とも異なる必要があります。")
+            else:
+                n = p * q
+                d = classroom_d(p, q, e)
+                if d is None:
+                    st.error("d（逆元）が求まりませんでした。e と p,q を見直してください。")
+                else:
+                    store_key("done_recv", n, e, d, (p, q, d % (p - 1), d % (q - 1), mod_inverse(q, p)),
+                              "鍵生成完了。以下の値をコピーしてください。")
+    else:
+        bits = st.select_slider("n のビット数", options=KEY_SIZES, value=2048, key='recv_bits')
+        parallel = st.checkbox(f"複数の CPU コアで並列に探す（{os.cpu_count()} コア）", key='recv_parallel')
+        st.caption(LARGE_KEY_DESC)
+
+        if st.button("鍵生成", key='recv_gen_big'):
+            with st.spinner("素数を探しています…"):
+                if parallel:
+                    key = generate_keypair_parallel(bits, executor=keygen_pool())
+                else:
+                    key = generate_keypair(bits)
+            store_key("done_recv", key.n, key.e, key.d, key.crt, f"{bits} ビットの鍵を生成しました。")
+
+    message = st.session_state.pop("keygen_msg", None)
+    if message:
+        st.success(message)
+
+def spool(chunks):
+    """ジェネレータの出力を一時ファイルに書き、download_button に渡す関数を返す。
+
+    結果全体の文字列を作らず、ダウンロードされたときに初めて読み込む。
+    """
+    f = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    for chunk in chunks:
+        f.write(chunk.encode("ascii"))
+
+    def read():
+        f.seek(0)
+        return f.read()
+    return read
+
+@st.fragment
+def recv_decrypt():
+    """受信者の復号（ファイルの復号を含む）。"""
+    st.caption("秘密鍵は (n, d) ですが、ここでは復号に必要な d を入力します。")
+    d1, d2, d3 = st.columns(3)
+    with d1:
+        n_in = st.text_input(
+            "公開鍵 n",
+            value=str(my_key().n or ""),
+            key='dec_n'
+        )
+    with d2:
+        d_in = st.text_input(
+            "秘密鍵 d",
+            value=str(my_key().d or ""),
+            key='dec_d'
+        )
+    with d3:
+        c_in = st.text_area("暗号文 (Base64)", max_chars=MAX_CIPHER_CHARS, key='dec_c')
+    mode = st.radio("暗号化の方式", BLOCK_MODES, horizontal=True, key='dec_mode')
+
+    if st.button("復号", key='dec_btn'):
+        try:
+            nv, dv = int(n_in), int(d_in)
+            msg = decrypt_with_mode(c_in, nv, dv, crt_for(nv, dv), mode)
+            st.success(f"復号結果: {msg}")
+        except ValueError as ve:
+            st.error(str(ve))
+        except binascii.Error:
+            st.error("Base64 の形式が正しくありません。")
+        except Exception as e2:
+            st.error(f"復号に失敗しました: {e2}")
+
+    with st.expander("ファイルをまとめて復号"):
+        st.caption(f"Base64 暗号文のファイル（{FILE_MAX_MB} MB まで）を少しずつ読みながら復号します。上の n, d と方式を使います。")
+        c_file = st.file_uploader("暗号文ファイル", key='dec_file', max_upload_size=FILE_MAX_MB)
+        if c_file is not None and st.button("ファイルを復号", key='dec_file_btn'):
+            try:
+                nv, dv = int(n_in), int(d_in)
+                if mode == BLOCK_MODES[2]:
+                    raise ValueError("ファイルの復号は「1文字ずつ」「まとめて」の方式のみ対応しています。")
+                out = spool(decrypt_stream(c_file, nv, dv, crt_for(nv, dv), pack=mode == BLOCK_MODES[1]))
+                st.download_button("復号結果をダウンロード", out, file_name="plain.txt", mime="text/plain",
+                                   key='dec_file_dl', on_click="ignore")
+            except ValueError as ve:
+                st.error(str(ve))
+            except binascii.Error:
+                st.error("Base64 の形式が正しくありません。")
+            except Exception as e2:
+                st.error(f"復号に失敗しました: {e2}")
+
+@st.fragment
+def send_encrypt():
+    """送信者の暗号化と、掲示板への送信。"""
+    board = exchange().keys()
+    if board:
+        names = {k["id"]: f"{k['name']}（n = {k['n']}, e = {k['e']}）" for k in board}
+        st.selectbox(
+            "掲示板の公開鍵から選ぶ",
+            [None, *names],
+            format_func=lambda k: "（選ばずに入力する）" if k is None else names.get(k, "（期限切れ）"),
+            key='enc_box',
+            on_change=fill_from_board,
+        )
+    mode = st.radio("暗号化の方式", BLOCK_MODES, horizontal=True, key='enc_mode')
+    # 初期値は自分の鍵。掲示板で選ぶと fill_from_board が書き換えるので、value= は使わない
+    st.session_state.setdefault("enc_n", str(my_key().n or ""))
+    st.session_state.setdefault("enc_e", str(my_key().e or ""))
+    s1, s2, s3 = st.columns(3)
+    with s1:
+        n_in = st.text_input(
+            "公開鍵 n",
+            key='enc_n'
+        )
+    with s2:
+        e_in = st.text_input(
+            "公開鍵 e",
+            key='enc_e'
+        )
+    with s3:
+        if mode == BLOCK_MODES[2]:
+            plain = st.text_area("平文（任意の文章）", key='enc_msg_long')
+        else:
+            plain = st.text_input(
+                f"平文 ({ALPHABET_DESC})",
+                max_chars=5,
+                key='enc_msg'
+            )
+
+    if st.button("暗号化", key='enc_btn'):
+        try:
+            nv, ev = int(n_in), int(e_in)
+            plain_upper = (plain or "").upper()
+            if mode == BLOCK_MODES[2] and nv.bit_length() < HYBRID_MIN_BITS:
+                st.error(f"ハイブリッド方式には {HYBRID_MIN_BITS} ビット以上の鍵が必要です。")
+            elif mode != BLOCK_MODES[2] and not re.fullmatch(r"[A-Z0-9]{1,5}", plain_upper):
+                st.error(f"平文は {ALPHABET_DESC} で入力してください。")
+            else:
+                b64 = encrypt_with_mode(plain if mode == BLOCK_MODES[2] else plain_upper, nv, ev, mode)
+                st.subheader("暗号文 (Base64)")
+                st.code(b64)
+                try:
+                    sessions().set_cipher(session_id(), b64)
+                except ValueError as ve:
+                    st.warning(f"{ve} 掲示板には送れません。")
+        except ValueError:
+            st.error("n や e が整数ではありません。")
+        except Exception as e:
+            st.error(f"暗号化に失敗しました: {e}")
+
+    box_id = st.session_state.get("enc_box")
+    if box_id and my_key().cipher:
+        sender = st.text_input("あなたの名前", key='enc_sender')
+        if st.button("この暗号文を掲示板の受信者に送る", key='enc_send'):
+            try:
+                exchange().post(box_id, sessions().cipher_b64(session_id()), sender, mode)
+                st.success("送りました。")
+            except KeyError:
+                st.error("受信箱が見つかりません（期限が切れた可能性があります）。")
+            except ValueError as ve:
+                st.error(str(ve))
+
+    if board and mode != BLOCK_MODES[2]:
+        with st.expander(f"同じ平文を掲示板の全員（{len(board)} 人）に送る"):
+            st.caption("平文の変換は 1 回だけ行い、各受信者の公開鍵での暗号化をまとめて計算します。上の平文と方式を使います。")
+            everyone = st.text_input("あなたの名前", key='enc_sender_all')
+            if st.button("全員に送る", key='enc_send_all'):
+                plain_upper = (plain or "").upper()
+                if not re.fullmatch(r"[A-Z0-9]{1,5}", plain_upper):
+                    st.error(f"平文は {ALPHABET_DESC} で入力してください。")
+                else:
+                    pack = mode == BLOCK_MODES[1]
+                    keys = [(k["n"], k["e"]) for k in board]
+                    pool = keygen_pool() if len(keys) >= PARALLEL_MIN_KEYS else None
+                    start = time.perf_counter()
+                    try:
+                        ciphers = encrypt_for_recipients(plain_upper, keys, pack, executor=pool)
+                    except ValueError as ve:
+                        st.error(str(ve))
+                    else:
+                        elapsed = time.perf_counter() - start
+                        sent = 0
+                        for k in board:
+                            try:
+                                exchange().post(k["id"], ciphers[key_fingerprint(k["n"], k["e"])], everyone, mode)
+                                sent += 1
+                            except KeyError:
+                                pass  # 途中で期限切れになった受信箱
+                        st.success(f"{sent} 人に送りました（暗号化 {elapsed * 1e3:.1f} ms、{len(keys) / max(elapsed, 1e-9):,.0f} 人/秒）。")
+
+    with st.expander("公開鍵 n から p, q を求める（教材用の鍵の答え合わせ）"):
+        st.caption("n を素因数分解できれば、公開鍵から秘密鍵 d を計算できてしまいます。教材用の小さな鍵なら、すべての組み合わせの表から一瞬で見つかります。")
+        if st.button("p, q を調べる", key='enc_factor_btn'):
+            index = key_index()
+            found = None
+            if n_in.strip().isdigit() and index is not None:
+                found = index.factor(int(n_in))
+            if found:
+                st.success(f"n = {found[0]} × {found[1]}")
+            else:
+                st.info("5000〜6000 の素数 2 つの積ではありません（または索引がありません）。")
+
+    with st.expander("ファイルをまとめて暗号化"):
+        st.caption(f"A–Z と 0–9 だけのテキストファイルを少しずつ読みながら暗号化します（{FILE_MAX_MB} MB まで・空白と改行は無視）。上の n, e と方式を使います。")
+        p_file = st.file_uploader("平文ファイル", key='enc_file', max_upload_size=FILE_MAX_MB)
+        if p_file is not None and st.button("ファイルを暗号化", key='enc_file_btn'):
+            try:
+                nv, ev = int(n_in), int(e_in)
+                if mode == BLOCK_MODES[2]:
+                    raise ValueError("ファイルの暗号化は「1文字ずつ」「まとめて」の方式のみ対応しています。")
+                out = spool(encrypt_stream(p_file, nv, ev, pack=mode == BLOCK_MODES[1]))
+                st.download_button("暗号文をダウンロード", out, file_name="cipher.txt", mime="text/plain",
+                                   key='enc_file_dl', on_click="ignore")
+            except ValueError as ve:
+                st.error(str(ve))
+            except Exception as e:
+                st.error(f"暗号化に失敗しました: {e}")
+
+@st.fragment
+def solo_keygen():
+    """一人で行うモードの鍵生成。"""
+    kind = st.radio("鍵の種類", KEY_KINDS, horizontal=True, key='solo_kind')
+    if kind == KEY_KINDS[0]:
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            p = st.selectbox("素数 p", primes, key='solo_p')
+        with c2:
+            q = st.selectbox("素数 q", primes, key='solo_q')
+        with c3:
+            e = st.number_input(
+                "公開鍵 e (5001–5999)",
+                min_value=5001,
+                max_value=5999,
+                step=1,
+                key='solo_e'
+            )
+
+        valid_now = e_status('solo', p, q, e)
+
+        if st.button("鍵生成", key='solo_gen'):
+            if p == q:
+                st.error("p と q は異なる素数を選んでください。")
+            elif not valid_now:
+                st.error("e は φ(n) と互いに素で、p と q とも異なる必要があります。")
+            else:
+                n1 = p * q
+                d1 = classroom_d(p, q, e)
+                if d1 is None:
+                    st.error("d（逆元）が求まりませんでした。e と p,q を見直してください。")
+                else:
+                    store_key("done_solo", n1, e, d1, (p, q, d1 % (p - 1), d1 % (q - 1), mod_inverse(q, p)),
+                              "鍵生成完了。下に表示された値をコピーして、次の欄に貼り付けてください。")
+    else:
+        bits = st.select_slider("n のビット数", options=KEY_SIZES, value=2048, key='solo_bits')
+        parallel = st.checkbox(f"複数の CPU コアで並列に探す（{os.cpu_count()} コア）", key='solo_parallel')
+        st.caption(LARGE_KEY_DESC)
+
+        if st.button("鍵生成", key='solo_gen_big'):
+            with st.spinner("素数を探しています…"):
+                if parallel:
+                    key = generate_keypair_parallel(bits, executor=keygen_pool())
+                else:
+                    key = generate_keypair(bits)
+            store_key("done_solo", key.n, key.e, key.d, key.crt, f"{bits} ビットの鍵を生成しました。")
+
+    message = st.session_state.pop("keygen_msg", None)
+    if message:
+        st.success(message)
+
+@st.fragment
+def solo_encrypt():
+    """一人で行うモードの暗号化。"""
+    st.caption(f"平文は {ALPHABET_DESC}（ハイブリッド方式では任意の文章）。上の公開鍵 n, e をコピーして貼り付けてください。")
+    mode = st.radio("暗号化の方式", BLOCK_MODES, horizontal=True, key='solo_enc_mode')
+    oc1, oc2, oc3 = st.columns(3)
+    with oc1:
+        n_enc = st.text_input(
+            "公開鍵 n",
+            value="",
+            placeholder="上で生成した n を貼り付け",
+            key='solo_enc_n'
+        )
+    with oc2:
+        e_enc = st.text_input(
+            "公開鍵 e",
+            value="",
+            placeholder="上で生成した e を貼り付け",
+            key='solo_enc_e'
+        )
+    with oc3:
+        if mode == BLOCK_MODES[2]:
+            plain1 = st.text_area("平文（任意の文章）", key='solo_plain1_long')
+        else:
+            plain1 = st.text_input(
+                f"平文 ({ALPHABET_DESC})",
+                max_chars=5,
+                key='solo_plain1'
+            )
+
+    if st.button("暗号化", key='solo_enc_btn'):
+        try:
+            nv, ev = int(n_enc), int(e_enc)
+            plain_upper = (plain1 or "").upper()
+            if mode == BLOCK_MODES[2] and nv.bit_length() < HYBRID_MIN_BITS:
+                st.error(f"ハイブリッド方式には {HYBRID_MIN_BITS} ビット以上の鍵が必要です。")
+            elif mode != BLOCK_MODES[2] and not re.fullmatch(r"[A-Z0-9]{1,5}", plain_upper):
+                st.error(f"平文は {ALPHABET_DESC} で入力してください。")
+            else:
+                b64 = encrypt_with_mode(plain1 if mode == BLOCK_MODES[2] else plain_upper, nv, ev, mode)
+                st.subheader("暗号文 (Base64)")
+                st.code(b64)
+        except ValueError:
+            st.error("n や e が整数ではありません。")
+        except Exception as e:
+            st.error(f"暗号化に失敗しました: {e}")
+
+
+@st.fragment
+def solo_decrypt():
+    """一人で行うモードの復号。"""
+    st.caption("秘密鍵は (n, d) です。上の値をコピーして貼り付けてください。")
+    dc1, dc2, dc3 = st.columns(3)
+    with dc1:
+        n_dec = st.text_input(
+            "公開鍵 n",
+            value="",
+            placeholder="上で生成した n を貼り付け",
+            key='solo_dec_n'
+        )
+    with dc2:
+        d_dec = st.text_input(
+            "秘密鍵 d",
+            value="",
+            placeholder="上で生成した d を貼り付け",
+            key='solo_dec_d'
+        )
+    with dc3:
+        ciph = st.text_area(
+            "暗号文 (Base64)",
+            value="",
+            placeholder="上で得た暗号文を貼り付け",
+            max_chars=MAX_CIPHER_CHARS,
+            key='solo_dec_c'
+        )
+    mode = st.radio("暗号化の方式", BLOCK_MODES, horizontal=True, key='solo_dec_mode')
+
+    if st.button("復号", key='solo_dec_btn'):
+        try:
+            nn, dd = int(n_dec), int(d_dec)
+            msg = decrypt_with_mode(ciph, nn, dd, crt_for(nn, dd), mode)
+            st.success(f"復号結果: {msg}")
+        except ValueError as ve:
+            st.error(str(ve))
+        except binascii.Error:
+            st.error("Base64 の形式が正しくありません。")
+        except Exception as e:
+            st.error(f"復号に失敗しました: {e}")
+
+@st.fragment
+def break_key():
+    """公開鍵 n の素因数分解。"""
+    st.caption("公開鍵 n を p × q に分解できれば、φ(n) と秘密鍵 d がすぐに計算できます。RSA の安全性は、大きな n の分解が現実的な時間では終わらないことに頼っています。")
+    b1, b2 = st.columns(2)
+    with b1:
+        n_in = st.text_input("公開鍵 n", value=str(my_key().n or ""), key='brk_n')
+    with b2:
+        e_in = st.text_input("公開鍵 e（d も求める場合）", value=str(my_key().e or ""), key='brk_e')
+    methods = st.multiselect(
+        "分解の方法",
+        list(FACTOR_METHODS),
+        default=list(FACTOR_METHODS),
+        format_func=FACTOR_METHODS.get,
+        key='brk_methods',
+    )
+    st.caption(
+        "試し割り: 小さい素数から順に割る。Pollard の rho 法: 乱数列の周期から約数を見つける。"
+        "Fermat 法: p と q が近いときだけ速い。"
+    )
+
+    if st.button("分解する", key='brk_btn'):
+        try:
+            nv = int(n_in)
+            if nv < 4 or is_probable_prime(nv):
+                raise ValueError
+        except ValueError:
+            st.error("n は 4 以上の合成数（素数でない整数）を入力してください。")
+        else:
+            rows = {"方法": [], "p": [], "q": [], "時間 (ms)": []}
+            found = None
+            for method in methods:
+                if nv.bit_length() > FACTOR_MAX_BITS[method]:
+                    p_f = q_f = "（大きすぎるため省略）"
+                    ms = None
+                else:
+                    with st.spinner(f"{FACTOR_METHODS[method]}で分解しています…"):
+                        p_f, q_f, secs = factoring.factor(nv, method)
+                    ms = round(secs * 1e3, 3)
+                    if p_f is None:
+                        p_f = q_f = "見つからず"
+                    else:
+                        found = (p_f, q_f)
+                rows["方法"].append(FACTOR_METHODS[method])
+                rows["p"].append(str(p_f))
+                rows["q"].append(str(q_f))
+                rows["時間 (ms)"].append(ms)
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+            if found and e_in.strip().isdigit():
+                p_f, q_f = found
+                d_f = mod_inverse(int(e_in), (p_f - 1) * (q_f - 1))
+                if d_f is not None:
+                    st.success(f"n = {p_f} × {q_f} なので、秘密鍵 d = {d_f} です。")
+            elif not found:
+                st.info(f"n は {nv.bit_length()} ビットです。実際の RSA（2048 ビット以上）はどの方法でも分解できません。")
+
+    with st.expander("ビット数と分解にかかる時間"):
+        st.caption("ランダムな n = p × q を 20 ビットから順に分解した時間です。1 回 0.5 秒を超えた方法はそこで打ち切ります。Fermat 法は p, q が近い n で測っています（離れていると試し割りより遅くなります）。")
+        max_bits = st.slider("最大ビット数", 40, 96, 64, step=4, key='brk_max_bits')
+        if st.button("測定する", key='brk_scale_btn'):
+            st.line_chart(factoring_scaling(max_bits), x="ビット数", y_label="時間 (ms)")
+
+@st.fragment
+def timing_attack():
+    """復号時間と d のビットパターン（pow と Montgomery ladder の比較）。"""
+    st.caption(
+        "d と同じビット数で 1 のビットの割合が違う指数を作り、同じ暗号文を何度も復号して時間を比べます。"
+        "Python の pow は 1 のビットが多いほど遅くなるので、時間から d の性質が漏れます。"
+        "Montgomery ladder はビットによらず同じ計算をするため、時間がほとんど変わりません（その分遅くなります）。"
+    )
+    t1, t2 = st.columns(2)
+    with t1:
+        bits = st.select_slider("鍵のビット数", options=[128, 256, 512], value=256, key='tim_bits')
+    with t2:
+        samples = st.slider("復号の回数（指数ごと）", 200, 5000, 1000, step=100, key='tim_samples')
+
+    if st.button("測定する", key='tim_btn'):
+        key = timing_key(bits)
+        exponents = timing.weight_exponents(key.d)
+        with st.spinner(f"{len(exponents) * 2 * samples:,} 回復号しています…"):
+            result = timing.decryption_timings(key.n, exponents, samples)
+        for engine, label in (("pow", "pow（組み込み）"), ("ladder", "Montgomery ladder")):
+            t = timing.leak_t(result[engine])
+            verdict = "時間から d のビットが漏れています" if t > timing.LEAK_T else "時間の差は見られません"
+            st.markdown(f"**{label}**: |t| = {t:.1f}（{timing.LEAK_T} を超えると差あり）→ {verdict}")
+            st.line_chart(timing_histogram(result[engine]), x="時間 (µs)", y_label="回数")
+        labels = list(exponents)
+        st.dataframe(
+            {
+                "指数": labels,
+                "1 のビット数": [bin(exponents[k]).count("1") for k in labels],
+                "pow 中央値 (µs)": [round(np.median(result["pow"][k]) / 1e3, 1) for k in labels],
+                "ladder 中央値 (µs)": [round(np.median(result["ladder"][k]) / 1e3, 1) for k in labels],
+            },
+            hide_index=True,
+            use_container_width=True,
+        )
 
 # --- 素数リスト (5000～6000) ---
-primes = [p for p in generate_primes(6000) if 5000 <= p <= 6000]
+primes = primes_between(5000, 6000)
 
 # --- セッション初期化 ---
 defaults = {
-    "n": None,
-    "e": None,
-    "d": None,
-    "cipher_str": "",
     "done_recv": False,
     "done_solo": False,
+    "mailbox": None,
 }
 for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
+# しばらく操作がなく鍵が消えていたら、それを使う欄も空に戻す
+key = my_key()
+expired = key.n is None and (st.session_state["done_recv"] or st.session_state["done_solo"])
+if expired:
+    for k in ("done_recv", "done_solo", "mailbox"):
+        st.session_state[k] = defaults[k]
+    for k in ("dec_n", "dec_d", "dec_c", "enc_n", "enc_e", "brk_n", "brk_e"):
+        st.session_state.pop(k, None)
+
 # --- アプリタイトル & 説明 ---
 st.title("PrimeGuard RSA")
 st.markdown(
@@ -103,144 +790,45 @@ RSA暗号ではまず2つの大きな素数 p, q を用意し、n = p × q を
 """
 )
 
+if expired:
+    st.info("しばらく操作がなかったため、鍵と暗号文を消去しました。もう一度鍵を生成してください。")
+
 st.subheader("役割を選択してください")
-role = st.radio("", ["受信者", "送信者", "一人で行う"], horizontal=True)
+role = st.radio("", ["受信者", "送信者", "一人で行う", "鍵を破る"], horizontal=True)
 st.markdown("---")
 
 # ========== 受信者モード ==========
 if role == "受信者":
     st.header("1. 鍵生成（受信者）")
-    st.caption("p, q は異なる素数を選び、φ(n) と互いに素な公開鍵 e を設定してください。e が勝手に変わらないよう、数値入力にしています。")
-
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        p = st.selectbox("素数 p", primes, key='recv_p')
-    with c2:
-        q = st.selectbox("素数 q", primes, key='recv_q')
-    with c3:
-        # e は number_input のデフォルト値 5001 をそのまま使う
-        e = st.number_input(
-            "公開鍵 e (5001–5999)",
-            min_value=5001,
-            max_value=5999,
-            step=1,
-            key='recv_e'
-        )
-
-    phi = (p - 1) * (q - 1)
-    valid_now = (gcd(e, phi) == 1) and (e not in (p, q))
-    st.caption(f"現在の e の妥当性: {'OK' if valid_now else 'NG'} / φ(n)={phi}")
-
-    if st.button("鍵生成", key='recv_gen'):
-        if p == q:
-            st.error("p と q は異なる素数を選んでください。")
-        elif not valid_now:
-            st.error("e は φ(n) と互いに素で、p と q とも異なる必要があります。")
-        else:
-            n = p * q
-            d = mod_inverse(e, phi)
-            if d is None:
-                st.error("d（逆元）が求まりませんでした。e と p,q を見直してください。")
-            else:
-                st.session_state["n"] = n
-                st.session_state["e"] = e
-                st.session_state["d"] = d
-                st.session_state["done_recv"] = True
-                st.session_state["dec_n"] = str(n)
-                st.session_state["dec_d"] = str(d)
-                st.success("鍵生成完了。以下の値をコピーしてください。")
+    recv_keygen()
 
     if st.session_state.get("done_recv", False):
         # 鍵表示とコピーボタン
-        for label, val in [
-            ("公開鍵 n", st.session_state["n"]),
-            ("公開鍵 e", st.session_state["e"]),
-            ("秘密鍵 d", st.session_state["d"]),
-        ]:
-            col, btn = st.columns([3, 1])
-            col.write(f"{label}: {val}")
-            with btn:
-                components.html(
-                    f"""
-                    <button style="border:none;background:none;padding:0;color:blue;cursor:pointer;"
-                        onclick="navigator.clipboard.writeText('{val}')">
-                        Copy
-                    </button>
-                    """,
-                    height=30,
-                )
+        key = my_key()
+        copy_buttons([
+            ("公開鍵 n", key.n),
+            ("公開鍵 e", key.e),
+            ("秘密鍵 d", key.d),
+        ])
+
+        with st.expander("掲示板に公開鍵を公開して、暗号文を受け取る"):
+            st.caption("公開すると、送信者は掲示板から公開鍵を選んで暗号文を送れます（コピー＆ペースト不要）。")
+            name = st.text_input("あなたの名前", key='recv_name')
+            if st.button("公開する", key='recv_publish'):
+                st.session_state["mailbox"] = exchange().publish(name, key.n, key.e)
+            if st.session_state["mailbox"]:
+                inbox(st.session_state["mailbox"])
 
         st.markdown("---")
         # 復号ステップ
         st.header("2. 復号（受信者）")
-        st.caption("秘密鍵は (n, d) ですが、ここでは復号に必要な d を入力します。")
-        d1, d2, d3 = st.columns(3)
-        with d1:
-            n_in = st.text_input(
-                "公開鍵 n",
-                value=st.session_state.get('dec_n', "") or "",
-                key='dec_n'
-            )
-        with d2:
-            d_in = st.text_input(
-                "秘密鍵 d",
-                value=st.session_state.get('dec_d', "") or "",
-                key='dec_d'
-            )
-        with d3:
-            c_in = st.text_area("暗号文 (Base64)", key='dec_c')
-
-        if st.button("復号", key='dec_btn'):
-            try:
-                nv, dv = int(n_in), int(d_in)
-                msg = decrypt_blocks(c_in, nv, dv)
-                st.success(f"復号結果: {msg}")
-            except ValueError as ve:
-                st.error(str(ve))
-            except binascii.Error:
-                st.error("Base64 の形式が正しくありません。")
-            except Exception as e2:
-                st.error(f"復号に失敗しました: {e2}")
+        recv_decrypt()
 
 # ========== 送信者モード ==========
 elif role == "送信者":
     st.header("1. 暗号化（送信者）")
-    st.caption(f"受信者の公開鍵を入力してください。平文は {ALPHABET_DESC}。")
-    s1, s2, s3 = st.columns(3)
-    with s1:
-        n_in = st.text_input(
-            "公開鍵 n",
-            value=str(st.session_state.get('n') or ""),
-            key='enc_n'
-        )
-    with s2:
-        e_in = st.text_input(
-            "公開鍵 e",
-            value=str(st.session_state.get('e') or ""),
-            key='enc_e'
-        )
-    with s3:
-        plain = st.text_input(
-            f"平文 ({ALPHABET_DESC})",
-            max_chars=5,
-            key='enc_msg'
-        )
-
-    if st.button("暗号化", key='enc_btn'):
-        try:
-            nv, ev = int(n_in), int(e_in)
-            plain_upper = (plain or "").upper()
-            if not re.fullmatch(r"[A-Z0-9]{1,5}", plain_upper):
-                st.error(f"平文は {ALPHABET_DESC} で入力してください。")
-            else:
-                b64 = encrypt_blocks(plain_upper, nv, ev)
-                st.subheader("暗号文 (Base64)")
-                st.code(b64)
-                st.session_state["cipher_str"] = b64
-        except ValueError:
-            st.error("n や e が整数ではありません。")
-        except Exception as e:
-            st.error(f"暗号化に失敗しました: {e}")
+    st.caption(f"受信者の公開鍵を入力してください。平文は {ALPHABET_DESC}（ハイブリッド方式では任意の文章）。")
+    send_encrypt()
 
 # ========== 一人で行うモード ==========
 elif role == "一人で行う":
@@ -261,142 +849,68 @@ elif role == "一人で行う":
 
 > 教材上の注意: ここではパディングなしで1文字ごとに暗号化します（体験用の簡略化）。
 """)
-
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        p = st.selectbox("素数 p", primes, key='solo_p')
-    with c2:
-        q = st.selectbox("素数 q", primes, key='solo_q')
-    with c3:
-        e = st.number_input(
-            "公開鍵 e (5001–5999)",
-            min_value=5001,
-            max_value=5999,
-            step=1,
-            key='solo_e'
-        )
-
-    phi1 = (p - 1) * (q - 1)
-    valid_now = (gcd(e, phi1) == 1) and (e not in (p, q))
-    st.caption(f"現在の e の妥当性: {'OK' if valid_now else 'NG'} / φ(n)={phi1}")
-
-    if st.button("鍵生成", key='solo_gen'):
-        if p == q:
-            st.error("p と q は異なる素数を選んでください。")
-        elif not valid_now:
-            st.error("e は φ(n) と互いに素で、p と q とも異なる必要があります。")
-        else:
-            n1 = p * q
-            d1 = mod_inverse(e, phi1)
-            if d1 is None:
-                st.error("d（逆元）が求まりませんでした。e と p,q を見直してください。")
-            else:
-                st.session_state["n"] = n1
-                st.session_state["e"] = e
-                st.session_state["d"] = d1
-                st.session_state["done_solo"] = True
-                st.success("鍵生成完了。下に表示された値をコピーして、次の欄に貼り付けてください。")
+    solo_keygen()
 
     if st.session_state.get("done_solo", False):
         # 鍵表示とコピー（自動入力はしない）
-        for label, val in [
-            ("公開鍵 n", st.session_state["n"]),
-            ("公開鍵 e", st.session_state["e"]),
-            ("秘密鍵 d", st.session_state["d"]),
-        ]:
-            col, btn = st.columns([3, 1])
-            col.write(f"{label}: {val}")
-            with btn:
-                components.html(
-                    f"""
-                    <button style="border:none;background:none;padding:0;color:blue;cursor:pointer;"
-                        onclick="navigator.clipboard.writeText('{val}')">
-                        Copy
-                    </button>
-                    """,
-                    height=30,
-                )
+        key = my_key()
+        copy_buttons([
+            ("公開鍵 n", key.n),
+            ("公開鍵 e", key.e),
+            ("秘密鍵 d", key.d),
+        ])
 
         st.info("手順: 上の n, e, d の値をコピーし、下の各欄に貼り付けてください。")
         st.markdown("---")
 
         # 暗号化
         st.header("2. 暗号化")
-        st.caption(f"平文は {ALPHABET_DESC}。上の公開鍵 n, e をコピーして貼り付けてください。")
-        oc1, oc2, oc3 = st.columns(3)
-        with oc1:
-            n_enc = st.text_input(
-                "公開鍵 n",
-                value="",
-                placeholder="上で生成した n を貼り付け",
-                key='solo_enc_n'
-            )
-        with oc2:
-            e_enc = st.text_input(
-                "公開鍵 e",
-                value="",
-                placeholder="上で生成した e を貼り付け",
-                key='solo_enc_e'
-            )
-        with oc3:
-            plain1 = st.text_input(
-                f"平文 ({ALPHABET_DESC})",
-                max_chars=5,
-                key='solo_plain1'
-            )
-
-        if st.button("暗号化", key='solo_enc_btn'):
-            try:
-                nv, ev = int(n_enc), int(e_enc)
-                plain_upper = (plain1 or "").upper()
-                if not re.fullmatch(r"[A-Z0-9]{1,5}", plain_upper):
-                    st.error(f"平文は {ALPHABET_DESC} で入力してください。")
-                else:
-                    b64 = encrypt_blocks(plain_upper, nv, ev)
-                    st.subheader("暗号文 (Base64)")
-                    st.code(b64)
-                    st.session_state["cipher_str"] = b64
-            except ValueError:
-                st.error("n や e が整数ではありません。")
-            except Exception as e:
-                st.error(f"暗号化に失敗しました: {e}")
+        solo_encrypt()
 
         st.markdown("---")
 
         # 復号
         st.header("3. 復号")
-        st.caption("秘密鍵は (n, d) です。上の値をコピーして貼り付けてください。")
-        dc1, dc2, dc3 = st.columns(3)
-        with dc1:
-            n_dec = st.text_input(
-                "公開鍵 n",
-                value="",
-                placeholder="上で生成した n を貼り付け",
-                key='solo_dec_n'
-            )
-        with dc2:
-            d_dec = st.text_input(
-                "秘密鍵 d",
-                value="",
-                placeholder="上で生成した d を貼り付け",
-                key='solo_dec_d'
-            )
-        with dc3:
-            ciph = st.text_area(
-                "暗号文 (Base64)",
-                value="",
-                placeholder="上で得た暗号文を貼り付け",
-                key='solo_dec_c'
-            )
-
-        if st.button("復号", key='solo_dec_btn'):
-            try:
-                nn, dd = int(n_dec), int(d_dec)
-                msg = decrypt_blocks(ciph, nn, dd)
-                st.success(f"復号結果: {msg}")
-            except ValueError as ve:
-                st.error(str(ve))
-            except binascii.Error:
-                st.error("Base64 の形式が正しくありません。")
-            except Exception as e:
-                st.error(f"復号に失敗しました: {e}")
+        solo_decrypt()
+
+# ========== 鍵を破るモード ==========
+elif role == "鍵を破る":
+    st.header("公開鍵 n を素因数分解する")
+    break_key()
+
+    st.markdown("---")
+    st.header("復号時間から秘密鍵 d を探る")
+    timing_attack()
+
+
+# 入力値など st.session_state の大きさも、このセッションの使用量に含める
+sessions().report_state(session_id(), deep_sizeof(st.session_state.to_dict()))
+
+# ========== 計測パネル（PRIMEGUARD_INSTRUMENT=1 で起動したときだけ） ==========
+if instrument.ENABLED:
+    instrument.observe("app.script_run", time.perf_counter() - _run_start)
+    with st.sidebar:
+        st.subheader("処理時間の計測")
+        stats = instrument.snapshot()
+        st.dataframe(
+            {
+                "処理": list(stats),
+                "回数": [v["count"] for v in stats.values()],
+                "平均 (ms)": [round(v["mean"] * 1e3, 3) for v in stats.values()],
+                "合計 (ms)": [round(v["total"] * 1e3, 1) for v in stats.values()],
+            },
+            hide_index=True,
+        )
+        st.caption("サーバープロセス全体（全セッション合計）の値です。app.script_run は再実行 1 回分の時間です。")
+        mem = sessions().memory()
+        per = mem["bytes"] / max(mem["sessions"], 1)
+        st.caption(
+            f"セッション {mem['sessions']} 件の鍵・暗号文・入力値: 合計 {mem['bytes'] / 1024:.1f} KB"
+            f"（平均 {per / 1024:.1f} KB、最大 {mem['max'] / 1024:.1f} KB）。"
+            f"500 人なら約 {per * 500 / 2**20:.1f} MB です。"
+        )
+        with st.expander("Prometheus 形式"):
+            st.code(instrument.render_prometheus(), language="text")
+        if st.button("リセット", key='metrics_reset'):
+            instrument.reset()
+            st.rerun()
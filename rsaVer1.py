@@ -2,38 +2,38 @@ import streamlit as st
 import base64
 import streamlit.components.v1 as components
 
+from primeguard.codec import decrypt_blocks, encrypt_blocks
+from primeguard.evalid import EValidator
+from primeguard.numtheory import mod_inverse
+from primeguard.primes import primes_in_range
+
 # --- ページ設定 ---
 st.set_page_config(page_title="PrimeGuard RSA デモ (実際はもっと大きな素数)")
 
 # --- ヘルパー関数 ---
-def generate_primes(n):
-    """2 以上 n 以下の素数をエラトステネスの篩で返す"""
-    sieve = [True] * (n + 1)
-    sieve[0:2] = [False, False]
-    for i in range(2, int(n**0.5) + 1):
-        if sieve[i]:
-            for j in range(i*i, n + 1, i):
-                sieve[j] = False
-    return [i for i, ok in enumerate(sieve) if ok]
-
-def gcd(a, b):
-    """a と b の最大公約数を返す"""
-    while b:
-        a, b = b, a % b
-    return a
-
-def mod_inverse(a, m):
-    """a × x ≡ 1 (mod m) のときの x を返す。なければ None"""
-    def egcd(x, y):
-        if y == 0:
-            return (1, 0, x)
-        u, v, g = egcd(y, x % y)
-        return (v, u - (x//y)*v, g)
-    x, _, g = egcd(a, m)
-    return x % m if g == 1 else None
+@st.cache_data(max_entries=16, show_spinner=False)
+def primes_between(lo, hi):
+    """lo 以上 hi 以下の素数リスト（全セッション共通でキャッシュ）"""
+    return list(primes_in_range(lo, hi))
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def e_list_for(p, q):
+    """(p, q) に対して選べる e の一覧（全セッション共通でキャッシュ）"""
+    v = EValidator()
+    v.update(p, q)
+    return [e for e in [3, 17, 65537] if v.is_valid(e)] + v.candidates()
+
+def e_ok(p, q, e, name):
+    """e が (p, q) で使えるか（セッションごとの判定表は p, q が変わったときだけ作り直す）"""
+    k = f"{name}_evalid"
+    if k not in st.session_state:
+        st.session_state[k] = EValidator()
+    v = st.session_state[k]
+    v.update(p, q)
+    return v.is_valid(e)
 
 # --- 素数リスト (5000～6000) ---
-primes = [p for p in generate_primes(6000) if 5000 <= p <= 6000]
+primes = primes_between(5000, 6000)
 
 # --- セッション初期化 ---
 for key in ['n','e','d','cipher_str','done_recv','done_solo']:
@@ -100,13 +100,12 @@ if role == "受信者":
         q = st.selectbox("素数 q", primes, key='recv_q')
     with c3:
         phi = (p - 1) * (q - 1)
-        common_es = [3, 17, 65537]
-        e_list = [e for e in common_es if gcd(e, phi) == 1] + \
-                 [i for i in range(5001, 6000) if gcd(i, phi) == 1 and i not in (p, q)]
-        e = st.selectbox("公開鍵 e", e_list, key='recv_e')
+        e = st.selectbox("公開鍵 e", e_list_for(p, q), key='recv_e')
     if st.button("鍵生成", key='recv_gen'):
         if p == q:
             st.error("p と q は異なる素数を選んでください。")
+        elif not e_ok(p, q, e, 'recv'):
+            st.error("e は φ(n) と互いに素で、p, q と異なる値を選んでください。")
         else:
             n = p * q
             d = mod_inverse(e, phi)
@@ -128,20 +127,16 @@ if role == "受信者":
         if st.button("復号", key='dec_btn'):
             try:
                 nv_i = int(nv); dv_i = int(dv)
-                cb = base64.b64decode(c_in)
-                size = (nv_i.bit_length() + 7) // 8
-                decoded = []
-                for i in range(0, len(cb), size):
-                    chunk = cb[i:i+size]
-                    num   = int.from_bytes(chunk, 'big')
-                    m     = pow(num, dv_i, nv_i)
-                    decoded.append(chr(m + 65))
-                msg = ''.join(decoded)
-                st.success(f"復号結果: {msg}")
             except ValueError:
                 st.error("数値変換エラー。鍵の値を確認してください。")
-            except base64.binascii.Error:
-                st.error("Base64 デコードエラー。暗号文を確認してください。")
+            else:
+                try:
+                    msg = decrypt_blocks(c_in, nv_i, dv_i)
+                    st.success(f"復号結果: {msg}")
+                except base64.binascii.Error:
+                    st.error("Base64 デコードエラー。暗号文を確認してください。")
+                except ValueError as e:
+                    st.error(str(e))  # ブロック長や復号値の範囲のエラー
 
 # --- 送信者モード ---
 elif role == "送信者":
@@ -152,14 +147,14 @@ elif role == "送信者":
     if st.button("暗号化", key='enc_btn'):
         try:
             nv_i = int(nv); ev_i = int(ev)
-            size = (nv_i.bit_length() + 7) // 8
-            cb = b''.join(pow(ord(c)-65, ev_i, nv_i).to_bytes(size, 'big') for c in plain)
-            b64 = base64.b64encode(cb).decode()
+            b64 = encrypt_blocks(plain.upper(), nv_i, ev_i)
             st.subheader("暗号文 (Base64)")
             st.code(b64)
             st.session_state.cipher_str = b64
         except ValueError:
             st.error("数値変換エラー。鍵の値を確認してください。")
+        except KeyError:
+            st.error("平文は A-Z で入力してください。")
 
 # --- 一人で実験モード ---
 elif role == "一人で実験":
@@ -167,12 +162,12 @@ elif role == "一人で実験":
     p1 = st.selectbox("素数 p1", primes, key='solo_p1')
     q1 = st.selectbox("素数 q1", primes, key='solo_q1')
     phi1 = (p1 - 1) * (q1 - 1)
-    e1_list = [e for e in [3,17,65537] if gcd(e,phi1)==1] + \
-              [i for i in range(5001,6000) if gcd(i,phi1)==1 and i not in (p1,q1)]
-    e1 = st.selectbox("公開鍵 e1", e1_list, key='solo_e1')
+    e1 = st.selectbox("公開鍵 e1", e_list_for(p1, q1), key='solo_e1')
     if st.button("鍵生成", key='solo_gen'):
         if p1==q1:
             st.error("p1 と q1 は異なる素数を選んでください。")
+        elif not e_ok(p1, q1, e1, 'solo'):
+            st.error("e は φ(n) と互いに素で、p, q と異なる値を選んでください。")
         else:
             n1 = p1*q1; d1 = mod_inverse(e1,phi1)
             st.session_state.update({'n':n1,'e':e1,'d':d1,'done_solo':True})
@@ -192,13 +187,13 @@ elif role == "一人で実験":
         if st.button("暗号化", key='solo_enc_btn'):
             try:
                 nv2 = int(n_enc); ev2 = int(e_enc)
-                size2 = (nv2.bit_length()+7)//8
-                cb2 = b''.join(pow(ord(c)-65, ev2, nv2).to_bytes(size2,'big') for c in plain1)
-                b64_2 = base64.b64encode(cb2).decode()
+                b64_2 = encrypt_blocks(plain1.upper(), nv2, ev2)
                 st.code(b64_2)
                 st.session_state.cipher_str = b64_2
             except ValueError:
                 st.error("数値変換エラー。鍵の値を確認してください。")
+            except KeyError:
+                st.error("平文は A-Z で入力してください。")
 
         st.header("3. 復号")
         n_dec = st.text_input("公開鍵 n", key='solo_dec_n')
@@ -207,17 +202,13 @@ elif role == "一人で実験":
         if st.button("復号", key='solo_dec_btn'):
             try:
                 nn = int(n_dec); dd = int(d_dec)
-                cb3 = base64.b64decode(ciph)
-                size3 = (nn.bit_length()+7)//8
-                decoded3 = []
-                for i in range(0,len(cb3),size3):
-                    chunk = cb3[i:i+size3]
-                    num3 = int.from_bytes(chunk,'big')
-                    m3 = pow(num3,dd,nn)
-                    decoded3.append(chr(m3+65))
-                msg3 = ''.join(decoded3)
-                st.success(f"復号結果: {msg3}")
             except ValueError:
                 st.error("数値変換エラー。鍵の値を確認してください。")
-            except base64.binascii.Error:
-                st.error("Base64 デコードエラー。暗号文を確認してください。")
+            else:
+                try:
+                    msg3 = decrypt_blocks(ciph, nn, dd)
+                    st.success(f"復号結果: {msg3}")
+                except base64.binascii.Error:
+                    st.error("Base64 デコードエラー。暗号文を確認してください。")
+                except ValueError as e:
+                    st.error(str(e))  # ブロック長や復号値の範囲のエラー
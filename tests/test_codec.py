@@ -0,0 +1,90 @@
+import base64
+import io
+import random
+
+import pytest
+
+from primeguard.codec import (ALPHABET, PACK_BASE, decrypt_blocks, decrypt_stream, encrypt_blocks,
+                              encrypt_stream, pack_width)
+from primeguard.keygen import generate_keypair, key_from_primes
+
+CLASSROOM = key_from_primes(5003, 5009, 5011)
+
+
+@pytest.fixture(scope="module", params=["classroom", 64, 512])
+def key(request):
+    return CLASSROOM if request.param == "classroom" else generate_keypair(request.param)
+
+
+def _message(length: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def test_pack_width():
+    assert pack_width(PACK_BASE) == 1
+    assert pack_width(PACK_BASE ** 2 - 1) == 1
+    assert pack_width(PACK_BASE ** 2) == 2
+    assert pack_width(CLASSROOM.n) == 4  # 37^4 ≤ 25060027 < 37^5
+    with pytest.raises(ValueError):
+        pack_width(PACK_BASE - 1)
+
+
+@pytest.mark.parametrize("pack", [False, True])
+def test_round_trip(key, pack):
+    for text in ("A", "AAAA", "HELLO", "0Z9A", _message(1000)):
+        b64 = encrypt_blocks(text, key.n, key.e, pack=pack)
+        assert decrypt_blocks(b64, key.n, key.d, pack=pack) == text
+        assert decrypt_blocks(b64, key.n, key.d, key.crt, pack=pack) == text
+
+
+def test_pack_uses_fewer_blocks(key):
+    text = _message(100)
+    size = (key.n.bit_length() + 7) // 8
+    k = pack_width(key.n)
+    one = base64.b64decode(encrypt_blocks(text, key.n, key.e))
+    packed = base64.b64decode(encrypt_blocks(text, key.n, key.e, pack=True))
+    assert len(one) == 100 * size
+    assert len(packed) == -(-100 // k) * size
+
+
+def test_lengths_not_multiple_of_pack_width(key):
+    k = pack_width(key.n)
+    for length in {1, max(k - 1, 1), k + 1, 2 * k + 1, 3 * k - 1}:
+        text = "A" * length  # 先頭の "A"（値 0）が失われないこと
+        b64 = encrypt_blocks(text, key.n, key.e, pack=True)
+        assert decrypt_blocks(b64, key.n, key.d, key.crt, pack=True) == text
+
+
+def test_wrong_mode_or_key_is_rejected():
+    b64 = encrypt_blocks("HELLO", CLASSROOM.n, CLASSROOM.e)
+    with pytest.raises(ValueError):
+        decrypt_blocks(b64[:-4], CLASSROOM.n, CLASSROOM.d)
+    other = key_from_primes(5011, 5021, 5003)
+    with pytest.raises(ValueError):
+        decrypt_blocks(encrypt_blocks("HELLO" * 10, CLASSROOM.n, CLASSROOM.e), other.n, other.d)
+
+
+@pytest.mark.parametrize("pack", [False, True])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1000])
+def test_stream_matches_blocks(key, pack, chunk_size):
+    text = _message(257, seed=chunk_size)
+    expected = encrypt_blocks(text, key.n, key.e, pack=pack)
+    # 空白と改行は無視し、小文字は大文字として扱う
+    src = io.StringIO("\n".join(text[i:i + 50] for i in range(0, len(text), 50)).lower())
+    b64 = "".join(encrypt_stream(src, key.n, key.e, pack=pack, chunk_size=chunk_size))
+    assert b64 == expected
+    plain = "".join(decrypt_stream(io.StringIO(expected), key.n, key.d, key.crt,
+                                   pack=pack, chunk_size=chunk_size))
+    assert plain == text
+
+
+def test_stream_reads_bytes():
+    src = io.BytesIO(b"HELLO WORLD")
+    b64 = "".join(encrypt_stream(src, CLASSROOM.n, CLASSROOM.e))
+    assert b64 == encrypt_blocks("HELLOWORLD", CLASSROOM.n, CLASSROOM.e)
+
+
+def test_stream_rejects_bad_characters():
+    with pytest.raises(ValueError):
+        list(encrypt_stream(io.StringIO("HELLO-WORLD"), CLASSROOM.n, CLASSROOM.e))
@@ -0,0 +1,24 @@
+from math import gcd
+
+from primeguard.evalid import E_HI, E_LO, e_candidates, e_valid_mask
+
+# 64 ビットの素数 2 つ（φ(n) は約 128 ビットで int64 に収まらない）
+P = 18446744073709551557
+Q = 18446744073709551533
+
+
+def _expected(phi, p, q, lo, hi):
+    return [e for e in range(lo, hi) if gcd(e, phi) == 1 and e not in (p, q)]
+
+
+def test_e_candidates_with_128_bit_phi():
+    phi = (P - 1) * (Q - 1)
+    assert phi.bit_length() == 128
+    assert e_candidates(phi, P, Q) == _expected(phi, P, Q, E_LO, E_HI)
+
+
+def test_e_valid_mask_excludes_p_and_q():
+    p, q = 5003, 5009
+    phi = (p - 1) * (q - 1)
+    mask = e_valid_mask(phi, p, q, 3, 6000)
+    assert [e for e, ok in zip(range(3, 6000), mask) if ok] == _expected(phi, p, q, 3, 6000)
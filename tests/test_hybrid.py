@@ -0,0 +1,87 @@
+import base64
+
+import pytest
+
+from primeguard.hybrid import HYBRID_MIN_BITS, hybrid_decrypt, hybrid_encrypt, oaep_decode, oaep_encode
+from primeguard.keygen import generate_keypair
+
+MESSAGE = "こんにちは RSA 12345"
+
+
+@pytest.fixture(scope="module")
+def key():
+    return generate_keypair(HYBRID_MIN_BITS)
+
+
+@pytest.fixture(scope="module")
+def other_key():
+    return generate_keypair(HYBRID_MIN_BITS)
+
+
+def _flip(b64: str, pos: int) -> str:
+    data = bytearray(base64.b64decode(b64))
+    data[pos] ^= 1
+    return base64.b64encode(data).decode()
+
+
+@pytest.mark.parametrize("use_crt", [False, True])
+@pytest.mark.parametrize("text", ["", "A", MESSAGE, "x" * 10_000])
+def test_round_trip(key, use_crt, text):
+    b64 = hybrid_encrypt(text, key.n, key.e)
+    assert hybrid_decrypt(b64, key.n, key.d, key.crt if use_crt else None) == text
+
+
+def test_round_trip_constant_time(key):
+    b64 = hybrid_encrypt(MESSAGE, key.n, key.e)
+    assert hybrid_decrypt(b64, key.n, key.d, key.crt, constant_time=True) == MESSAGE
+
+
+def test_encryption_is_randomized(key):
+    assert hybrid_encrypt(MESSAGE, key.n, key.e) != hybrid_encrypt(MESSAGE, key.n, key.e)
+
+
+@pytest.mark.parametrize("part", ["nonce", "tag", "body"])
+def test_tampering_is_rejected(key, part):
+    size = (key.n.bit_length() + 7) // 8
+    pos = {"nonce": size, "tag": size + 16, "body": size + 48}[part]
+    b64 = _flip(hybrid_encrypt(MESSAGE, key.n, key.e), pos)
+    with pytest.raises(ValueError):
+        hybrid_decrypt(b64, key.n, key.d, key.crt)
+
+
+def test_tampered_wrapped_key_is_rejected(key):
+    b64 = _flip(hybrid_encrypt(MESSAGE, key.n, key.e), 5)
+    with pytest.raises(ValueError):
+        hybrid_decrypt(b64, key.n, key.d, key.crt)
+
+
+def test_truncated_ciphertext_is_rejected(key):
+    data = base64.b64decode(hybrid_encrypt(MESSAGE, key.n, key.e))
+    size = (key.n.bit_length() + 7) // 8
+    with pytest.raises(ValueError):
+        hybrid_decrypt(base64.b64encode(data[:size + 47]).decode(), key.n, key.d)
+
+
+def test_wrong_key_is_rejected(key, other_key):
+    b64 = hybrid_encrypt(MESSAGE, key.n, key.e)
+    with pytest.raises(ValueError):
+        hybrid_decrypt(b64, other_key.n, other_key.d, other_key.crt)
+    with pytest.raises(ValueError):
+        hybrid_decrypt(b64, key.n, other_key.d)
+
+
+@pytest.mark.parametrize("bits", [512, HYBRID_MIN_BITS - 24])
+def test_small_key_is_rejected(bits):
+    small = generate_keypair(bits)
+    with pytest.raises(ValueError):
+        hybrid_encrypt(MESSAGE, small.n, small.e)
+
+
+def test_oaep_round_trip_and_bad_padding():
+    block = oaep_encode(b"secret", 128)
+    assert len(block) == 128 and block[0] == 0
+    assert oaep_decode(block) == b"secret"
+    with pytest.raises(ValueError):
+        oaep_decode(b"\x01" + block[1:])
+    with pytest.raises(ValueError):
+        oaep_encode(b"x" * 63, 128)
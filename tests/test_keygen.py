@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from primeguard.cli import main as cli_main
+from primeguard.keygen import (MIN_KEY_BITS, MIN_PRIME_BITS, generate_keypair, generate_keypair_parallel,
+                               is_probable_prime, random_prime)
+
+
+def _within(seconds: float, fn, *args):
+    # 以前は 16 ビットの素数を探して無限ループしていたので、終わらなければ失敗にする
+    result = []
+    worker = threading.Thread(target=lambda: result.append(fn(*args)), daemon=True)
+    worker.start()
+    worker.join(seconds)
+    assert result, f"{fn.__name__}{args} が {seconds} 秒で終わりません"
+    return result[0]
+
+
+def test_random_prime_at_minimum_size():
+    for bits in (MIN_PRIME_BITS, MIN_PRIME_BITS + 1):
+        for _ in range(20):
+            p = _within(10, random_prime, bits)
+            assert p.bit_length() == bits and is_probable_prime(p)
+
+
+def test_generate_keypair_at_minimum_size():
+    for bits in (MIN_KEY_BITS, MIN_KEY_BITS + 1):
+        for _ in range(10):
+            key = _within(10, generate_keypair, bits)
+            assert key.n.bit_length() == bits
+            assert pow(pow(12345, key.e, key.n), key.d, key.n) == 12345
+
+
+@pytest.mark.parametrize("bits", [2, 15, 16, MIN_PRIME_BITS - 1])
+def test_random_prime_below_minimum_raises(bits):
+    with pytest.raises(ValueError):
+        random_prime(bits)
+
+
+@pytest.mark.parametrize("bits", [30, 31, 32, MIN_KEY_BITS - 1])
+def test_generate_keypair_below_minimum_raises(bits):
+    with pytest.raises(ValueError):
+        generate_keypair(bits)
+    with pytest.raises(ValueError):
+        generate_keypair_parallel(bits, workers=1)
+
+
+def test_cli_rejects_small_bits(capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli_main(["keygen", "--count", "1", "--bits", "32"])
+    assert exc.value.code == 2
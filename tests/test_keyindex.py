@@ -0,0 +1,93 @@
+from math import gcd
+
+import pytest
+
+from primeguard.keyindex import _HEADER, KeyIndex, build_index, open_index
+from primeguard.primes import primes_in_range
+
+LO, HI, E_LO, E_HI = 5000, 5100, 5001, 5200
+PRIMES = list(primes_in_range(LO, HI))
+
+
+@pytest.fixture(scope="module")
+def path(tmp_path_factory):
+    return build_index(str(tmp_path_factory.mktemp("idx") / "keys.idx"), LO, HI, E_LO, E_HI)
+
+
+def _expected_d(p, q, e):
+    phi = (p - 1) * (q - 1)
+    if p == q or e in (p, q) or gcd(e, phi) != 1:
+        return None
+    return pow(e, -1, phi)
+
+
+def test_lookup_matches_mod_inverse(path):
+    with KeyIndex(path) as index:
+        assert index.primes == tuple(PRIMES)
+        for p in PRIMES[::3]:
+            for q in PRIMES:
+                for e in range(E_LO, E_HI, 7):
+                    assert index.lookup(p, q, e) == _expected_d(p, q, e)
+
+
+def test_table_and_covers(path):
+    with KeyIndex(path) as index:
+        p, q = PRIMES[0], PRIMES[-1]
+        table = index.table(q, p)
+        assert table["e"] == [e for e in range(E_LO, E_HI) if _expected_d(p, q, e)]
+        assert table["d"] == [_expected_d(p, q, e) for e in table["e"]]
+        assert index.table(p, p) == {"e": [], "d": []}
+        assert index.covers(p, q, E_LO) and not index.covers(p, q, E_HI)
+        assert not index.covers(5101, q, E_LO) and index.lookup(5101, q, E_LO) is None
+
+
+def test_factor(path):
+    with KeyIndex(path) as index:
+        for i, p in enumerate(PRIMES):
+            for q in PRIMES[i + 1:]:
+                assert index.factor(p * q) == (p, q)
+        assert index.factor(PRIMES[0] ** 2) is None
+        assert index.factor(PRIMES[0] * PRIMES[1] + 2) is None
+        assert index.factor(1) is None
+        assert index.factor(HI * HI) is None
+
+
+def test_open_index(tmp_path, path):
+    missing = str(tmp_path / "missing.idx")
+    assert open_index(missing) is None
+    with open_index(path) as index:
+        assert index.factor(PRIMES[0] * PRIMES[1]) == (PRIMES[0], PRIMES[1])
+
+
+def _write(tmp_path, data: bytes) -> str:
+    target = tmp_path / "bad.idx"
+    target.write_bytes(data)
+    return str(target)
+
+
+def test_empty_file_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        KeyIndex(_write(tmp_path, b""))
+
+
+@pytest.mark.parametrize("keep", [4, _HEADER.size - 1, _HEADER.size, _HEADER.size + 10, -1])
+def test_truncated_file_is_rejected(tmp_path, path, keep):
+    with open(path, "rb") as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        KeyIndex(_write(tmp_path, data[:keep]))
+
+
+def test_padded_file_is_rejected(tmp_path, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        KeyIndex(_write(tmp_path, data + b"\0" * 4))
+
+
+@pytest.mark.parametrize("header", [b"XXXX", b"PGKI\x02\0\0\0"])
+def test_bad_header_is_rejected(tmp_path, path, header):
+    with open(path, "rb") as f:
+        data = f.read()
+    with pytest.raises(ValueError):
+        KeyIndex(_write(tmp_path, header + data[len(header):]))
@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from primeguard.keygen import generate_keypair
+from primeguard.numtheory import Montgomery, crt_pow, ladder_pow
+
+SMALL_MODULI = [3, 5, 7, 15, 101, 5003, 25060027, (1 << 61) - 1]
+
+
+def _bases(n: int, rng):
+    return [0, 1, 2, n - 1, n, n + 1, 3 * n + 2, -2, rng.randrange(n), rng.randrange(n, n << 40)]
+
+
+def _exponents(n: int, rng):
+    bits = n.bit_length()
+    odd = rng.getrandbits(bits) | 1
+    return [0, 1, 2, 3, odd, odd - 1, (1 << bits) - 1, 1 << bits, rng.getrandbits(3 * bits)]
+
+
+@pytest.mark.parametrize("n", SMALL_MODULI)
+def test_ladder_pow_matches_pow_small(n):
+    rng = random.Random(n)
+    for b in _bases(n, rng):
+        for e in _exponents(n, rng):
+            assert ladder_pow(b, e, n) == pow(b, e, n), (b, e, n)
+
+
+@pytest.mark.parametrize("bits", [512, 2048])
+def test_ladder_pow_matches_pow_large(bits):
+    rng = random.Random(bits)
+    key = generate_keypair(bits)
+    n = key.n
+    for b in (0, 1, n - 1, n + 5, rng.randrange(n)):
+        for e in (0, 1, key.e, key.d, key.d - 1):
+            assert ladder_pow(b, e, n) == pow(b, e, n)
+    c = rng.randrange(n)
+    assert crt_pow(c, *key.crt, modpow=ladder_pow) == pow(c, key.d, n)
+
+
+def test_montgomery_rejects_even_modulus_and_negative_exponent():
+    with pytest.raises(ValueError):
+        Montgomery(10)
+    with pytest.raises(ValueError):
+        ladder_pow(2, -1, 11)